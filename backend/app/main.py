@@ -313,8 +313,8 @@ def cleanup(ear=None, brain=None, mouth=None):
         logger.warning(f"Error cleaning up Ear: {e}")
     
     try:
-        if mouth and hasattr(mouth, '_audio') and mouth._audio:
-            mouth._audio.terminate()
+        if mouth:
+            mouth.close()
             logger.debug("Mouth PyAudio terminated")
     except Exception as e:
         logger.warning(f"Error cleaning up Mouth: {e}")
@@ -27,14 +27,20 @@ Usage:
 
 import os
 import re
+import time
 import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Generator, Optional
 from dataclasses import dataclass, field
 
+import numpy as np
 from groq import Groq
 from dotenv import load_dotenv
 
-from app.services.knowledge import get_knowledge_base
+from app.services.knowledge import RetrievalBatcher, get_knowledge_base
+from app.services.semantic_cache import SemanticCache
 
 # ============================================================
 # CONFIGURATION
@@ -48,10 +54,31 @@ DEFAULT_MODEL = os.environ.get("GROQ_MODEL", "llama-3.3-70b-versatile")
 DEFAULT_TEMPERATURE = float(os.environ.get("GROQ_TEMPERATURE", "0.4"))  # Reduced from 0.5
 DEFAULT_MAX_TOKENS = int(os.environ.get("GROQ_MAX_TOKENS", "350"))  # Slightly reduced for conciseness
 
+# Model routing - short cool-down / off-syllabus turns go to the fast 8B model
+MODEL_ROUTING = os.environ.get("MODEL_ROUTING", "true").lower() == "true"
+FAST_MODEL = os.environ.get("GROQ_FAST_MODEL", "llama-3.1-8b-instant")
+FAST_MODEL_MAX_CHARS = 40
+FAST_MODEL_MAX_RAG_SCORE = 0.2
+
 # RAG configuration
 RELEVANCE_THRESHOLD = float(os.environ.get("RAG_THRESHOLD", "0.35"))
 MAX_CONTEXT_RESULTS = int(os.environ.get("RAG_MAX_RESULTS", "3"))
 
+# Semantic response cache (reuse answers to near-identical single-turn questions)
+RESPONSE_CACHE = os.environ.get("RESPONSE_CACHE", "true").lower() == "true"
+RESPONSE_CACHE_THRESHOLD = float(os.environ.get("RESPONSE_CACHE_THRESHOLD", "0.95"))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "300"))
+
+# Conversation memory - recent messages verbatim, older ones folded into a
+# rolling summary (by the fast model) so the prompt stops growing
+HISTORY_MAX_MESSAGES = int(os.environ.get("HISTORY_MAX_MESSAGES", "10"))
+HISTORY_SUMMARY_EVERY = 4  # Evicted messages per summarization call
+SUMMARY_MAX_TOKENS = 150
+
+# httpx drops pooled connections idle longer than this (its default keepalive
+# expiry); past it, the next Groq call would pay a fresh TCP + TLS handshake
+GROQ_KEEPALIVE_SECONDS = 5.0
+
 # Special tokens
 HANGUP_TOKEN = "[HANGUP]"
 
@@ -92,6 +119,14 @@ CONFUSION_PHRASES = [
     "lost", "i'm lost", "help", "clarify", "unclear"
 ]
 
+# Cool-down signals ("got it", "makes sense") - short turns matching these
+# skip RAG: there is nothing to look up, just validate and pivot
+CLOSURE_RE = re.compile(
+    r"\b(thanks|thank you|makes sense|i get it|got it|understood|okay cool|oh i see)\b",
+    re.IGNORECASE
+)
+CLOSURE_MAX_CHARS = 40
+
 logger = logging.getLogger(__name__)
 
 
@@ -108,24 +143,113 @@ class Message:
 
 @dataclass
 class ConversationContext:
-    """Tracks conversation state."""
-    history: list[Message] = field(default_factory=list)
+    """
+    Tracks conversation state.
+    
+    Only the last HISTORY_MAX_MESSAGES messages are kept verbatim (ring
+    buffer); older ones queue up in `evicted` until the Brain folds them
+    into `summary`, so the prompt size per turn stays bounded.
+    
+    Evicted messages stay in the prompt until a summary covering them is
+    stored. The summary is written from a background thread: `evicted`
+    and `summary` are guarded by a lock, and `generation` changes on
+    clear() so a summary of the previous session is discarded.
+    """
+    history: deque[Message] = field(default_factory=lambda: deque(maxlen=HISTORY_MAX_MESSAGES))
+    summary: str = ""
+    evicted: list[Message] = field(default_factory=list)
+    user_turns: int = 0
+    generation: int = 0
+    _summarizing: bool = field(default=False, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    
+    def _append(self, message: Message) -> None:
+        """Append, keeping the message about to fall out of the window."""
+        with self._lock:
+            if len(self.history) == self.history.maxlen:
+                self.evicted.append(self.history[0])
+            self.history.append(message)
     
     def add_user(self, content: str) -> None:
         """Add a user message."""
-        self.history.append(Message(role="user", content=content))
+        self.user_turns += 1
+        self._append(Message(role="user", content=content))
     
     def add_assistant(self, content: str) -> None:
         """Add an assistant message."""
-        self.history.append(Message(role="assistant", content=content))
+        self._append(Message(role="assistant", content=content))
+    
+    def begin_summary(self) -> tuple[list[Message], str, int]:
+        """
+        Snapshot the evicted messages for one summarization run.
+        
+        They stay in `evicted` (and in the prompt) until end_summary()
+        stores a summary covering them. Only one run at a time gets
+        messages; a concurrent call gets an empty list.
+        
+        Returns:
+            (evicted messages, current summary, generation to hand back
+             to end_summary())
+        """
+        with self._lock:
+            if self._summarizing or not self.evicted:
+                return [], self.summary, self.generation
+            self._summarizing = True
+            return list(self.evicted), self.summary, self.generation
+    
+    def end_summary(self, generation: int, summary: Optional[str] = None, covered: int = 0) -> bool:
+        """
+        Finish a summarization run started by begin_summary().
+        
+        Args:
+            generation: Generation returned by begin_summary()
+            summary: New summary, or None if the run failed (messages are kept)
+            covered: Number of evicted messages the summary covers
+        
+        Returns:
+            True if the summary was stored (False if cleared since, or failed)
+        """
+        with self._lock:
+            if generation != self.generation:
+                return False
+            self._summarizing = False
+            if summary is None:
+                return False
+            self.summary = summary
+            del self.evicted[:covered]
+            return True
+    
+    def pending_evicted(self) -> int:
+        """Number of evicted messages not yet folded into the summary."""
+        with self._lock:
+            return len(self.evicted)
     
     def to_messages(self) -> list[dict]:
-        """Convert to Groq message format."""
-        return [{"role": m.role, "content": m.content} for m in self.history]
+        """
+        Convert to Groq message format.
+        
+        Rolling summary first, then messages evicted but not summarized
+        yet (so no turn drops out of the prompt), then the recent window.
+        """
+        with self._lock:
+            messages = [
+                {"role": m.role, "content": m.content}
+                for m in (*self.evicted, *self.history)
+            ]
+            summary = self.summary
+        if summary:
+            messages.insert(0, {"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+        return messages
     
     def clear(self) -> None:
         """Clear conversation history."""
-        self.history = []
+        with self._lock:
+            self.history.clear()
+            self.evicted = []
+            self.summary = ""
+            self.user_turns = 0
+            self.generation += 1
+            self._summarizing = False
     
     @property
     def last_user_message(self) -> Optional[str]:
@@ -137,8 +261,8 @@ class ConversationContext:
     
     @property
     def turn_count(self) -> int:
-        """Count the number of conversation turns."""
-        return len([m for m in self.history if m.role == "user"])
+        """Count the number of conversation turns (including summarized ones)."""
+        return self.user_turns
 
 
 # ============================================================
@@ -175,70 +299,19 @@ class Brain:
     # THE SOCRATIC SYSTEM PROMPT - FULL STATE MACHINE LOGIC
     # ========================================================
     
-    SYSTEM_PROMPT_BASE = """You are ZED, a high-performance Socratic tutor.
-
-YOUR CORE MISSION: Build critical thinking and deep understanding. Never create dependency.
-
-=== SOCRATIC STATE MACHINE (3 STATES) ===
-
-STATE 1 — GYM PHASE (User is wrong, guessing, or learning):
-- Detect: Incorrect answers, vague responses, "I think...", "Maybe..."
-- Action: Ask scaffolding questions that guide them to the answer
-- If course material is provided, reference specific slides/pages: "Slide 14 defines X. How does that apply here?"
-- NEVER give the full answer directly
-- Keep questions focused and build on their partial understanding
-- Example: "You said X causes Y. But what happens to Y when X approaches zero?"
-
-STATE 2 — COOL-DOWN PHASE (User got it right):
-- Detect: Correct answer, proper reasoning, "So it's because...", demonstrates understanding
-- Detect signals: "correct", "I got it", "that makes sense", "oh I see", "right, so..."
-- Action: FIRST validate them briefly ("Exactly.", "Right.", "That's it.")
-- Then IMMEDIATELY ask a follow-up Challenge Question in the SAME response
-- DO NOT say goodbye. DO NOT ask "Do you want to continue?" or "Need help with anything else?"
-- DO NOT end the conversation just because they got one answer right
-- Just push to the next logical step — keep the momentum going
-- Example: "Exactly. Now — what happens when variance equals zero? What does that mean for the distribution?"
-- Example: "Right. But here's the edge case: what if your sample size is 1?"
-- The conversation only ends when the user explicitly says "goodbye" or "I'm done"
-
-STATE 3 — CHALLENGE PHASE (Push for mastery):
-- Detect: User has answered correctly 2+ times or shows solid grasp
-- Action: Throw edge cases, tricky variations, or real-world applications
-- Make them prove they truly understand, not just memorized
-- Examples:
-  * "Good. But what if n approaches infinity?"
-  * "Correct. Now, can you explain why this fails for heavy-tailed distributions?"
-  * "Right. But in production, what happens when your sample is biased?"
-- Continue challenging until they explicitly request to stop
-
-=== EXCEPTION HANDLERS ===
-
-EXCEPTION: USER IS CONFUSED ("I don't understand", "Huh?", "What?"):
-- Action: Provide a BRIEF, clear explanation (2-3 sentences max)
-- Then immediately check their understanding with a simple question
-- Example: "The variance measures how spread out values are from the mean. Higher variance = more spread. Quick check: if all values are identical, what's the variance?"
-
-EXCEPTION: USER IS TIRED ("I'm done", "That's enough", "Thanks, bye"):
-- Action: Acknowledge respectfully and validate the session
-- Keep it brief and encouraging
-- Example: "Good session. You nailed the core concepts. Rest up — mastery takes reps."
-
-=== TONE & STYLE ===
-
-- Concise, sharp, academic — like a senior engineer or professor who respects your time
-- NO fluff: Never say "I'm glad you asked", "Great question!", "Let me explain..."
-- Be direct: Get to the point immediately
-- Relentless but fair: Push hard, but acknowledge when they're right
-- Brief responses: 1-3 sentences for questions, slightly more for explanations
-
-=== STRICT RULES ===
-
-1. If context is provided below, USE IT to craft specific questions referencing slides, pages, or concepts
-2. If no context is provided, use your general knowledge
-3. Always prefer questions over answers — make them work
-4. The goal is MASTERY through struggle, not instant gratification
-5. When they're right, say so clearly THEN pivot to the next challenge
-6. Never let them off easy after one correct answer"""
+    # Kept terse on purpose: it is prefilled on every turn
+    SYSTEM_PROMPT_BASE = """You are ZED, a concise Socratic tutor. Goal: mastery through struggle, never dependency.
+
+STATES:
+1. GYM (user wrong/guessing/vague): ask one scaffolding question; never give the full answer. Cite provided slides/pages ("Slide 14 defines X. How does that apply here?").
+2. COOL-DOWN (user correct, "got it", "makes sense"): validate in a word ("Exactly."), then ask a harder follow-up in the SAME reply. Never say goodbye or ask "anything else?".
+3. CHALLENGE (correct 2+ times): push edge cases and real-world twists ("What if n is 1?", "What if the sample is biased?").
+
+EXCEPTIONS:
+- Confused ("huh?", "I don't understand"): explain in 2-3 sentences, then a quick check question.
+- Done ("I'm done", "bye"): brief, encouraging sign-off.
+
+STYLE: direct, sharp, academic; no fluff ("Great question!"); 1-3 sentences. Prefer questions over answers. Use provided course material; otherwise general knowledge. Only the user ends the session."""
 
     CONTEXT_INJECTION_TEMPLATE = """
 
@@ -251,6 +324,19 @@ INSTRUCTION: Reference this material directly in your Socratic questions. Cite s
 
 NOTE: No specific course material retrieved for this query. Use your general knowledge to guide the Socratic dialogue."""
 
+    CLOSURE_TEMPLATE = """
+
+NOTE: The user signaled understanding (COOL-DOWN PHASE). Validate briefly, then pivot to the next challenge."""
+
+    # The no-context and closure notes never change - build them once
+    NO_CONTEXT_MESSAGE = {"role": "system", "content": NO_CONTEXT_TEMPLATE.strip()}
+    CLOSURE_MESSAGE = {"role": "system", "content": CLOSURE_TEMPLATE.strip()}
+    
+    # SYSTEM_PROMPT_BASE is sent as its own first message and must stay
+    # byte-identical across turns (no interpolation), so Groq's prompt
+    # prefix cache can reuse it; per-turn RAG context goes in a second one
+    BASE_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT_BASE}
+
     def __init__(
         self,
         model: str = DEFAULT_MODEL,
@@ -271,14 +357,48 @@ NOTE: No specific course material retrieved for this query. Use your general kno
         
         self.client = Groq(api_key=api_key)
         self.kb = get_knowledge_base()
+        # Concurrent sessions' retrievals share one batched query
+        self.retriever = RetrievalBatcher(self.kb)
         
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
         
+        self.response_cache = SemanticCache(
+            threshold=RESPONSE_CACHE_THRESHOLD, ttl=RESPONSE_CACHE_TTL
+        ) if RESPONSE_CACHE else None
+        
+        # Reconnects to Groq in the background while RAG retrieval runs
+        self._warm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="groq-warm")
+        # Folds old conversation history into its summary - separate from the
+        # warm-up so a multi-second LLM call never delays reconnecting
+        self._summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summary")
+        self._groq_last_used = 0.0
+        
         logger.info(f"🧠 Brain initialized | Model: {model} | Temp: {temperature} | Max Tokens: {max_tokens}")
     
-    def _retrieve_context(self, query: str) -> str:
+    def _warm_groq_connection(self) -> None:
+        """
+        Re-open the pooled Groq connection if it has likely expired.
+        
+        Runs a cheap models.list() on a background thread, so the TCP + TLS
+        handshake overlaps RAG retrieval instead of delaying the completion
+        request. A no-op while the connection is still fresh.
+        """
+        now = time.monotonic()
+        if now - self._groq_last_used < GROQ_KEEPALIVE_SECONDS:
+            return
+        self._groq_last_used = now
+        
+        def warm():
+            try:
+                self.client.models.list()
+            except Exception as e:
+                logger.debug(f"Groq warm-up failed: {e}")
+        
+        self._warm_executor.submit(warm)
+    
+    def _retrieve_context(self, query: str) -> tuple[str, float]:
         """
         Retrieve relevant context from the knowledge base.
         
@@ -286,47 +406,55 @@ NOTE: No specific course material retrieved for this query. Use your general kno
             query: User's question
         
         Returns:
-            Formatted context string or empty string if nothing relevant
+            (formatted context string or "" if nothing relevant,
+             best similarity score among the results)
         """
         try:
-            results = self.kb.search(query, n_results=MAX_CONTEXT_RESULTS)
+            results = self.retriever.search(query, n_results=MAX_CONTEXT_RESULTS)
         except Exception as e:
             logger.warning(f"Knowledge base search failed: {e}")
-            return ""
+            return "", 0.0
         
-        # Filter by relevance threshold
-        relevant = [r for r in results if r.get('score', 0) > RELEVANCE_THRESHOLD]
+        # Filter by relevance threshold with one vectorized comparison
+        scores = np.fromiter((r.get('score') or 0.0 for r in results), dtype=np.float64, count=len(results))
+        top_score = float(scores.max()) if scores.size else 0.0
+        relevant = np.flatnonzero(scores > RELEVANCE_THRESHOLD)
         
-        if not relevant:
+        if not relevant.size:
             logger.debug(f"No relevant context for: {query[:50]}...")
-            return ""
+            return "", top_score
         
-        # Format context block with clear source attribution
+        # Format context block with clear source attribution, joined once
         context_lines = []
-        for r in relevant:
-            source_info = f"{r.get('source', 'Unknown')}"
+        for i in relevant:
+            r = results[i]
+            source_info = r.get('source', 'Unknown')
             if r.get('page'):
-                source_info += f", Page {r['page']}"
+                source_info = f"{source_info}, Page {r['page']}"
             context_lines.append(f"[{source_info}]:\n{r.get('text', '')}")
         
-        logger.info(f"📚 RAG: Found {len(relevant)} chunks (scores: {[round(r['score'], 3) for r in relevant]})")
+        logger.info(f"📚 RAG: Found {relevant.size} chunks (scores: {scores[relevant].round(3).tolist()})")
         
-        return "\n\n---\n\n".join(context_lines)
+        return "\n\n---\n\n".join(context_lines), top_score
     
-    def _build_system_prompt(self, context: str) -> str:
+    def _build_system_messages(self, context: str) -> list[dict]:
         """
-        Build the full system prompt with dynamically injected context.
+        Build the system messages: the static base prompt, then the context.
         
         Args:
             context: Retrieved course material (may be empty)
         
         Returns:
-            Complete system prompt with context injection
+            [base prompt message, context (or no-context note) message]
         """
         if context:
-            return self.SYSTEM_PROMPT_BASE + self.CONTEXT_INJECTION_TEMPLATE.format(context=context)
+            context_message = {
+                "role": "system",
+                "content": self.CONTEXT_INJECTION_TEMPLATE.format(context=context).strip()
+            }
+            return [self.BASE_SYSTEM_MESSAGE, context_message]
         
-        return self.SYSTEM_PROMPT_BASE + self.NO_CONTEXT_TEMPLATE
+        return [self.BASE_SYSTEM_MESSAGE, self.NO_CONTEXT_MESSAGE]
     
     def _is_termination_request(self, text: str) -> bool:
         """
@@ -391,6 +519,83 @@ NOTE: No specific course material retrieved for this query. Use your general kno
         
         return False
     
+    def _is_closure_signal(self, text: str) -> bool:
+        """
+        Check if a short turn just acknowledges understanding.
+        
+        Args:
+            text: User's message
+        
+        Returns:
+            True for brief cool-down turns ("got it", "makes sense")
+        """
+        return len(text) < CLOSURE_MAX_CHARS and CLOSURE_RE.search(text) is not None
+    
+    def _summarize_history(self, conversation: ConversationContext) -> None:
+        """
+        Fold evicted messages into the conversation's rolling summary.
+        
+        Runs on the summary executor with the fast model, so it never
+        delays a response; the new summary is used from the next turn.
+        
+        Args:
+            conversation: Conversation whose evicted messages to summarize
+        """
+        evicted, summary, generation = conversation.begin_summary()
+        if not evicted:
+            return
+        
+        transcript = "\n".join(f"{m.role}: {m.content}" for m in evicted)
+        prompt = (
+            "Update the running summary of a tutoring session. Keep the topics "
+            "covered, what the student got right or wrong, and any open question. "
+            "Reply with the summary only, at most 3 sentences.\n\n"
+            f"Current summary: {summary or '(none)'}\n\n"
+            f"New messages:\n{transcript}"
+        )
+        try:
+            response = self.client.chat.completions.create(
+                model=FAST_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.0,
+                max_tokens=SUMMARY_MAX_TOKENS
+            )
+            summary = response.choices[0].message.content.strip()
+        except Exception as e:
+            # Messages stay in `evicted` (and the prompt) for the next attempt
+            conversation.end_summary(generation)
+            logger.warning(f"History summarization failed: {e}")
+            return
+        
+        if conversation.end_summary(generation, summary, len(evicted)):
+            logger.debug(f"📝 History summary updated: {summary[:80]}...")
+        else:
+            logger.debug("Conversation cleared during summarization - summary dropped")
+    
+    def _pick_model(self, user_text: str, closure: bool, rag_score: float) -> str:
+        """
+        Choose the Groq model for this turn.
+        
+        Short turns that are either cool-down signals or match nothing in
+        the course material need no deep reasoning, so they go to the much
+        faster 8B model; everything else uses the configured model.
+        
+        Args:
+            user_text: User's message
+            closure: Whether the turn is a cool-down signal
+            rag_score: Best retrieval similarity (0 when RAG was skipped)
+        
+        Returns:
+            Model name
+        """
+        if (
+            MODEL_ROUTING
+            and len(user_text) < FAST_MODEL_MAX_CHARS
+            and (closure or rag_score < FAST_MODEL_MAX_RAG_SCORE)
+        ):
+            return FAST_MODEL
+        return self.model
+    
     def process(
         self, 
         user_text: str,
@@ -405,7 +610,8 @@ NOTE: No specific course material retrieved for this query. Use your general kno
         1. Check for TERMINATION signals → Yield closing message + [HANGUP]
         2. Retrieve RAG context
         3. Build system prompt with injected context
-        4. Stream LLM response tokens
+        4. Replay a cached answer to a near-identical question, or
+        5. Stream LLM response tokens
         
         Args:
             user_text: The user's question/statement
@@ -433,45 +639,84 @@ NOTE: No specific course material retrieved for this query. Use your general kno
             return
         
         # =================================================
-        # STEP 1: Retrieve Context (RAG)
+        # STEP 1: Retrieve Context (RAG), reconnecting to
+        # Groq concurrently if the connection went idle.
+        # Cool-down turns skip retrieval entirely.
         # =================================================
-        context = self._retrieve_context(user_text)
+        self._warm_groq_connection()
+        closure = self._is_closure_signal(user_text)
+        context, rag_score = ("", 0.0) if closure else self._retrieve_context(user_text)
+        model = self._pick_model(user_text, closure, rag_score)
         
         # =================================================
         # STEP 2: Build System Prompt with Dynamic Context
         # =================================================
-        system_prompt = self._build_system_prompt(context)
+        if closure:
+            logger.info("🧘 Cool-down signal - skipped RAG")
+            messages = [self.BASE_SYSTEM_MESSAGE, self.CLOSURE_MESSAGE]
+        else:
+            messages = self._build_system_messages(context)
+        
+        # The per-turn system message identifies the prompt for the response cache
+        turn_context = messages[-1]["content"]
         
         # =================================================
         # STEP 3: Prepare Messages
         # =================================================
-        messages = [{"role": "system", "content": system_prompt}]
-        
         if conversation:
-            # Add conversation history
+            # Add conversation history (summary + recent window); fold
+            # messages that left the window into the summary off-thread
             messages.extend(conversation.to_messages())
+            if conversation.pending_evicted() >= HISTORY_SUMMARY_EVERY:
+                self._summary_executor.submit(self._summarize_history, conversation)
         else:
             # Single turn - just the user message
             messages.append({"role": "user", "content": user_text})
         
         # =================================================
-        # STEP 4: Stream from Groq (Temperature 0.4)
+        # STEP 4: Semantic Response Cache (single-turn only -
+        # with history the right answer depends on earlier turns)
+        # =================================================
+        query_emb = None
+        if self.response_cache is not None and not conversation:
+            try:
+                query_emb = self.kb.embed_query(user_text)
+            except Exception as e:
+                logger.warning(f"Response cache embedding failed: {e}")
+            
+            if query_emb is not None:
+                cached = self.response_cache.lookup(query_emb, turn_context)
+                if cached is not None:
+                    logger.info(f"⚡ Response cache hit for: {user_text[:50]}...")
+                    yield from cached
+                    return
+        
+        # =================================================
+        # STEP 5: Stream from Groq (Temperature 0.4), 8B for
+        # short cool-down / off-syllabus turns
         # =================================================
         try:
-            logger.debug(f"🚀 Calling Groq | Model: {self.model} | Temp: {self.temperature}")
+            logger.debug(f"🚀 Calling Groq | Model: {model} | Temp: {self.temperature}")
             
             stream = self.client.chat.completions.create(
-                model=self.model,
+                model=model,
                 messages=messages,
                 temperature=self.temperature,
                 max_tokens=self.max_tokens,
                 stream=True
             )
             
+            tokens = []
             for chunk in stream:
                 content = chunk.choices[0].delta.content
                 if content:
+                    tokens.append(content)
                     yield content
+            self._groq_last_used = time.monotonic()
+            
+            # Only complete responses are cached (not errors or abandoned streams)
+            if query_emb is not None and tokens:
+                self.response_cache.add(query_emb, turn_context, tokens)
         
         except Exception as e:
             logger.error(f"❌ Groq API error: {e}")
@@ -629,7 +874,7 @@ if __name__ == "__main__":
                 query = user_input[8:].strip()
                 if query:
                     print(f"\n{Fore.YELLOW}📚 Retrieving context for: '{query}'{Style.RESET_ALL}\n")
-                    context = brain._retrieve_context(query)
+                    context, _ = brain._retrieve_context(query)
                     if context:
                         print(f"{Fore.CYAN}{context}{Style.RESET_ALL}")
                     else:
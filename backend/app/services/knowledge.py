@@ -15,10 +15,16 @@ import os
 import re
 import hashlib
 import logging
+import multiprocessing
+import queue
+import sqlite3
 import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Literal
+from typing import Iterable, Iterator, Optional, Literal
 
+import numpy as np
 import chromadb
 from chromadb.config import Settings
 
@@ -28,11 +34,23 @@ try:
 except ImportError:
     fitz = None
 
-# For embeddings - using sentence-transformers (local, fast)
+# sentence-transformers / torch are imported lazily in _load_embedder():
+# they dominate import time and aren't needed for stats/clear or PDF workers
+
+# For quantized ONNX embeddings (optional, faster on CPU)
+try:
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoTokenizer
+except ImportError:
+    ort = None
+    AutoTokenizer = None
+
+# Only needed once, to export the model to ONNX
 try:
-    from sentence_transformers import SentenceTransformer
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
 except ImportError:
-    SentenceTransformer = None
+    ORTModelForFeatureExtraction = None
 
 
 # ============================================================
@@ -47,13 +65,64 @@ CHROMA_PERSIST_DIR = Path(
 # Embedding model - all-MiniLM-L6-v2 is fast and good for semantic search
 EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 
+# int8-quantized ONNX export of EMBEDDING_MODEL - used instead of PyTorch on CPU.
+# Opt-in: optimum[onnxruntime] is not in requirements.txt; with it installed the
+# model is exported and quantized automatically on first load if missing.
+ONNX_EMBEDDER = os.environ.get("ONNX_EMBEDDER", "false").lower() == "true"
+ONNX_EMBEDDING_DIR = Path(
+    os.environ.get("ONNX_EMBEDDING_DIR") or
+    Path(__file__).parent.parent.parent / "data" / "minilm_int8"
+)
+EMBEDDING_MAX_SEQ_LENGTH = 256  # all-MiniLM-L6-v2 truncation length
+
+# Run the PyTorch embedder in half precision when it lands on a CUDA device
+EMBEDDING_FP16 = os.environ.get("EMBEDDING_FP16", "true").lower() == "true"
+EMBEDDING_BATCH_SIZE = 256  # texts per encoder forward pass
+
+# Set LAZY_LOAD_KB=true to skip the background warm-up at import (e.g. CLI tools)
+LAZY_LOAD_KB = os.environ.get("LAZY_LOAD_KB", "false").lower() in ("1", "true")
+
 # Collection name in ChromaDB
 COLLECTION_NAME = os.environ.get("CHROMA_COLLECTION", "course_knowledge")
 
+# Embeddings are unit-length, so index with cosine distance (1 - cos);
+# search scores are then plain cosine similarity. The HNSW graph is built
+# denser than Chroma's defaults (M=16, construction_ef=100) for better recall
+# per hop on larger corpora.
+COLLECTION_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:M": 24,
+    "hnsw:construction_ef": 128,
+    "hnsw:search_ef": 100,
+    "description": "Zed course knowledge base"
+}
+
+# Query result caching: exact LRU + near-duplicate (semantic) lookup
+QUERY_CACHE_SIZE = 512
+SEMANTIC_CACHE_SIZE = 64
+SEMANTIC_CACHE_THRESHOLD = 0.97  # cosine similarity between query embeddings
+QUERY_EMBED_CACHE_SIZE = 2000    # memoized query embeddings (float16)
+
+# Concurrent searches coalesced into one search_batch() call (max queries)
+RETRIEVAL_MAX_BATCH = 16
+
+# MMR re-ranking: candidates fetched per requested result
+MMR_FETCH_MULTIPLIER = 4
+
 # Chunking settings
 MAX_CHUNK_SIZE = 500  # characters
 CHUNK_OVERLAP = 50    # overlap between chunks
 
+# Ingestion progress is logged once per this many batches
+INGEST_LOG_EVERY = 10
+
+# Parallel PDF extraction (process pool size cap)
+PDF_EXTRACT_WORKERS = 8
+
+# PDF block filtering - drops page numbers, footers and other tiny text blocks
+MIN_BLOCK_AREA = 2000  # bbox area in points^2
+MIN_BLOCK_CHARS = 3    # stripped characters
+
 logger = logging.getLogger(__name__)
 
 
@@ -61,6 +130,10 @@ logger = logging.getLogger(__name__)
 # PDF PARSER
 # ============================================================
 
+# Text cleanup patterns (compiled once, applied per page)
+_EXTRA_NEWLINES_RE = re.compile(r'\n{3,}')
+_EXTRA_SPACES_RE = re.compile(r' {2,}')
+
 class PDFParser:
     """
     Extracts text from PDFs with slide-aware chunking.
@@ -78,6 +151,23 @@ class PDFParser:
         Returns:
             List of dicts: [{"page": 1, "text": "...", "source": "filename.pdf"}, ...]
         
+        Raises:
+            ImportError: If PyMuPDF is not installed
+            FileNotFoundError: If PDF doesn't exist
+        """
+        return list(PDFParser.iter_pages(pdf_path))
+    
+    @staticmethod
+    def iter_pages(pdf_path: str) -> Iterator[dict]:
+        """
+        Lazily extract text from a PDF file, yielding one page dict at a time.
+        
+        Args:
+            pdf_path: Path to the PDF file
+        
+        Yields:
+            Page dicts: {"page": 1, "text": "...", "source": "filename.pdf", ...}
+        
         Raises:
             ImportError: If PyMuPDF is not installed
             FileNotFoundError: If PDF doesn't exist
@@ -89,32 +179,53 @@ class PDFParser:
         if not pdf_path.exists():
             raise FileNotFoundError(f"PDF not found: {pdf_path}")
         
-        pages = []
+        dropped_chars = 0
         doc = fitz.open(str(pdf_path))
         
         try:
             for page_num, page in enumerate(doc, start=1):
-                text = page.get_text("text")
-                text = PDFParser._clean_text(text)
+                # Blocks: (x0, y0, x1, y1, text, block_no, block_type).
+                # Keep MuPDF's native block order (no reading-order sort) and
+                # don't preserve images: we only embed the text, and line order
+                # within a slide barely affects the embedding.
+                kept = []
+                blocks = page.get_text("blocks", flags=fitz.TEXTFLAGS_BLOCKS, sort=False)
+                for block in blocks:
+                    if PDFParser._is_content_block(block):
+                        kept.append(block[4])
+                    elif block[6] == 0:
+                        dropped_chars += len(block[4])
+                
+                # Blank/image-only pages: skip before any cleanup work
+                if not kept:
+                    continue
                 
-                if text.strip():
-                    pages.append({
-                        "page": page_num,
-                        "text": text,
-                        "source": pdf_path.name,
-                        "source_path": str(pdf_path)
-                    })
+                yield {
+                    "page": page_num,
+                    "text": PDFParser._clean_text("\n".join(kept)),
+                    "source": pdf_path.name,
+                    "source_path": str(pdf_path)
+                }
         finally:
             doc.close()
         
-        return pages
+        if dropped_chars:
+            logger.debug(f"Dropped {dropped_chars} chars of small text blocks from {pdf_path.name}")
+    
+    @staticmethod
+    def _is_content_block(block: tuple) -> bool:
+        """Keep text blocks large enough to be real content (not page numbers/footers)."""
+        x0, y0, x1, y1, text, _, block_type = block[:7]
+        if block_type != 0:  # image block
+            return False
+        return (x1 - x0) * (y1 - y0) >= MIN_BLOCK_AREA and len(text.strip()) >= MIN_BLOCK_CHARS
     
     @staticmethod
     def _clean_text(text: str) -> str:
         """Clean extracted PDF text."""
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        text = re.sub(r' {2,}', ' ', text)
-        text = re.sub(r'\x00', '', text)  # null bytes
+        text = _EXTRA_NEWLINES_RE.sub('\n\n', text)
+        text = _EXTRA_SPACES_RE.sub(' ', text)
+        text = text.replace('\x00', '')  # null bytes
         return text.strip()
     
     @staticmethod
@@ -134,6 +245,29 @@ class PDFParser:
         Returns:
             Combined list of all pages from all PDFs
         """
+        return list(PDFParser.iter_from_directory(directory, extensions, recursive))
+    
+    @staticmethod
+    def iter_from_directory(
+        directory: str,
+        extensions: Optional[list[str]] = None,
+        recursive: bool = True
+    ) -> Iterator[dict]:
+        """
+        Lazily extract pages from all PDFs in a directory.
+        
+        Files are parsed in parallel, but pages are yielded file by file in
+        discovery order so downstream chunking/embedding can start as soon as
+        the first PDF is done.
+        
+        Args:
+            directory: Path to directory containing PDFs
+            extensions: File extensions to process (default: ['.pdf'])
+            recursive: Whether to search subdirectories
+        
+        Yields:
+            Page dicts, in the same order as extract_from_directory()
+        """
         if extensions is None:
             extensions = ['.pdf']
         
@@ -141,20 +275,45 @@ class PDFParser:
         if not directory.exists():
             raise FileNotFoundError(f"Directory not found: {directory}")
         
-        all_pages = []
         glob_pattern = "**/*" if recursive else "*"
+        pdf_files = [
+            pdf_file
+            for ext in extensions
+            for pdf_file in directory.glob(f"{glob_pattern}{ext}")
+        ]
         
-        for ext in extensions:
-            for pdf_file in directory.glob(f"{glob_pattern}{ext}"):
-                logger.info(f"Processing: {pdf_file.name}")
-                try:
-                    pages = PDFParser.extract_text_from_pdf(str(pdf_file))
-                    all_pages.extend(pages)
-                    logger.info(f"Extracted {len(pages)} pages from {pdf_file.name}")
-                except Exception as e:
-                    logger.warning(f"Error processing {pdf_file.name}: {e}")
+        if len(pdf_files) <= 1:
+            for pdf_file in pdf_files:
+                yield from PDFParser._extract_logged(pdf_file)
+            return
         
-        return all_pages
+        # Parsing is CPU-bound Python per file - fan out across processes.
+        # Always spawn: forking while the kb-warmup thread holds torch /
+        # onnxruntime / tokenizer locks can deadlock the child
+        workers = min(PDF_EXTRACT_WORKERS, len(pdf_files), os.cpu_count() or 1)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            futures = [
+                pool.submit(PDFParser._extract_logged, pdf_file)
+                for pdf_file in pdf_files
+            ]
+            # Keep discovery order so chunk ordering is deterministic
+            for future in futures:
+                yield from future.result()
+    
+    @staticmethod
+    def _extract_logged(pdf_file: Path) -> list[dict]:
+        """Extract one PDF, logging and swallowing errors (returns [] on failure)."""
+        logger.info(f"Processing: {pdf_file.name}")
+        try:
+            pages = PDFParser.extract_text_from_pdf(str(pdf_file))
+            logger.info(f"Extracted {len(pages)} pages from {pdf_file.name}")
+            return pages
+        except Exception as e:
+            logger.warning(f"Error processing {pdf_file.name}: {e}")
+            return []
 
 
 # ============================================================
@@ -164,6 +323,24 @@ class PDFParser:
 ChunkingStrategy = Literal["page", "size", "topic"]
 
 
+def make_chunk_id(key: bytes) -> str:
+    """12-hex-char chunk ID (48-bit BLAKE2b digest of the key)."""
+    return hashlib.blake2b(key, digest_size=6).hexdigest()
+
+
+# Section header patterns for "topic" chunking (compiled once, matched per line)
+HEADER_PATTERNS = [
+    r'^(?:Chapter|Section|Topic|Module|Unit|Lecture)\s*\d*[:\.]?\s*',
+    r'^\d+\.\s+[A-Z]',
+    r'^[A-Z][A-Z\s]{2,}$',
+    r'^#{1,3}\s+',
+]
+_HEADER_RE = re.compile('|'.join(HEADER_PATTERNS), re.IGNORECASE)
+
+# Sentence boundaries for "size" chunking
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+
 class TextChunker:
     """Smart text chunking strategies for course materials."""
     
@@ -195,14 +372,36 @@ class TextChunker:
         else:
             raise ValueError(f"Unknown chunking strategy: {strategy}")
     
+    @staticmethod
+    def iter_chunks(
+        pages: Iterable[dict],
+        strategy: ChunkingStrategy = "page",
+        max_size: int = MAX_CHUNK_SIZE,
+        overlap: int = CHUNK_OVERLAP
+    ) -> Iterator[dict]:
+        """
+        Lazily chunk a stream of pages (every strategy works page by page).
+        
+        Args:
+            pages: Iterable of page dicts, e.g. PDFParser.iter_pages()
+            strategy: "page", "size", or "topic"
+            max_size: Max chunk size for "size" strategy
+            overlap: Overlap size for "size" strategy
+        
+        Yields:
+            Chunk dicts with 'id', 'text', 'metadata'
+        """
+        for page in pages:
+            yield from TextChunker.chunk([page], strategy, max_size, overlap)
+    
     @staticmethod
     def _chunk_by_page(pages: list[dict]) -> list[dict]:
         """Each page/slide is one chunk."""
         chunks = []
         for page in pages:
-            chunk_id = hashlib.md5(
-                f"{page['source']}:{page['page']}".encode()
-            ).hexdigest()[:12]
+            chunk_id = make_chunk_id(
+                b"%s:%d" % (page["source"].encode(), page["page"])
+            )
             
             chunks.append({
                 "id": chunk_id,
@@ -223,26 +422,33 @@ class TextChunker:
     ) -> list[dict]:
         """Split text into fixed-size chunks with overlap."""
         chunks = []
+        # Carry ceil(overlap / 10) trailing words into the next chunk
+        overlap_words = -(-overlap // 10)
         
         for page in pages:
             text = page["text"]
-            sentences = re.split(r'(?<=[.!?])\s+', text)
+            sentences = _SENTENCE_SPLIT_RE.split(text)
             
-            current_chunk = ""
+            # Accumulate sentences in a list and track the running length so
+            # long pages don't pay for repeated string reallocation.
+            current_parts: list[str] = []
+            current_len = 0
             chunk_num = 0
             
             for sentence in sentences:
-                if len(current_chunk) + len(sentence) <= max_size:
-                    current_chunk += sentence + " "
+                if current_len + len(sentence) <= max_size:
+                    current_parts.append(sentence)
+                    current_len += len(sentence) + 1
                 else:
-                    if current_chunk.strip():
-                        chunk_id = hashlib.md5(
-                            f"{page['source']}:{page['page']}:{chunk_num}".encode()
-                        ).hexdigest()[:12]
+                    chunk_text = " ".join(current_parts).strip()
+                    if chunk_text:
+                        chunk_id = make_chunk_id(
+                            b"%s:%d:%d" % (page["source"].encode(), page["page"], chunk_num)
+                        )
                         
                         chunks.append({
                             "id": chunk_id,
-                            "text": current_chunk.strip(),
+                            "text": chunk_text,
                             "metadata": {
                                 "source": page["source"],
                                 "page": page["page"],
@@ -252,18 +458,20 @@ class TextChunker:
                         })
                         chunk_num += 1
                     
-                    words = current_chunk.split()
-                    overlap_text = " ".join(words[-overlap//10:]) if words else ""
-                    current_chunk = overlap_text + " " + sentence + " "
+                    words = TextChunker._tail_words(current_parts, overlap_words)
+                    overlap_text = " ".join(words)
+                    current_parts = [overlap_text, sentence]
+                    current_len = len(overlap_text) + len(sentence) + 2
             
-            if current_chunk.strip():
-                chunk_id = hashlib.md5(
-                    f"{page['source']}:{page['page']}:{chunk_num}".encode()
-                ).hexdigest()[:12]
+            chunk_text = " ".join(current_parts).strip()
+            if chunk_text:
+                chunk_id = make_chunk_id(
+                    b"%s:%d:%d" % (page["source"].encode(), page["page"], chunk_num)
+                )
                 
                 chunks.append({
                     "id": chunk_id,
-                    "text": current_chunk.strip(),
+                    "text": chunk_text,
                     "metadata": {
                         "source": page["source"],
                         "page": page["page"],
@@ -274,17 +482,32 @@ class TextChunker:
         
         return chunks
     
+    @staticmethod
+    def _tail_words(parts: list[str], n: int) -> list[str]:
+        """
+        Return the last ``n`` words of ``" ".join(parts)`` without
+        re-splitting the whole chunk.
+        
+        Args:
+            parts: Text fragments making up the current chunk
+            n: Number of trailing words (non-positive keeps slice semantics)
+            
+        Returns:
+            Trailing words, in order
+        """
+        if n <= 0:
+            return " ".join(parts).split()[-n:]
+        
+        words: list[str] = []
+        for part in reversed(parts):
+            words[:0] = part.split()
+            if len(words) >= n:
+                break
+        return words[-n:]
+    
     @staticmethod
     def _chunk_by_topic(pages: list[dict]) -> list[dict]:
         """Chunk by topic/section headers."""
-        header_patterns = [
-            r'^(?:Chapter|Section|Topic|Module|Unit|Lecture)\s*\d*[:\.]?\s*',
-            r'^\d+\.\s+[A-Z]',
-            r'^[A-Z][A-Z\s]{2,}$',
-            r'^#{1,3}\s+',
-        ]
-        combined_pattern = '|'.join(header_patterns)
-        
         chunks = []
         
         for page in pages:
@@ -292,19 +515,20 @@ class TextChunker:
             lines = text.split('\n')
             
             current_topic = ""
-            current_content = ""
+            current_content: list[str] = []
             chunk_num = 0
             
             for line in lines:
-                if re.match(combined_pattern, line, re.IGNORECASE):
-                    if current_content.strip():
-                        chunk_id = hashlib.md5(
-                            f"{page['source']}:{page['page']}:{chunk_num}".encode()
-                        ).hexdigest()[:12]
+                if _HEADER_RE.match(line):
+                    content = "\n".join(current_content)
+                    if content.strip():
+                        chunk_id = make_chunk_id(
+                            b"%s:%d:%d" % (page["source"].encode(), page["page"], chunk_num)
+                        )
                         
                         chunks.append({
                             "id": chunk_id,
-                            "text": f"{current_topic}\n{current_content}".strip(),
+                            "text": f"{current_topic}\n{content}".strip(),
                             "metadata": {
                                 "source": page["source"],
                                 "page": page["page"],
@@ -315,18 +539,19 @@ class TextChunker:
                         chunk_num += 1
                     
                     current_topic = line
-                    current_content = ""
+                    current_content.clear()
                 else:
-                    current_content += line + "\n"
+                    current_content.append(line)
             
-            if current_content.strip():
-                chunk_id = hashlib.md5(
-                    f"{page['source']}:{page['page']}:{chunk_num}".encode()
-                ).hexdigest()[:12]
+            content = "\n".join(current_content)
+            if content.strip():
+                chunk_id = make_chunk_id(
+                    b"%s:%d:%d" % (page["source"].encode(), page["page"], chunk_num)
+                )
                 
                 chunks.append({
                     "id": chunk_id,
-                    "text": f"{current_topic}\n{current_content}".strip(),
+                    "text": f"{current_topic}\n{content}".strip(),
                     "metadata": {
                         "source": page["source"],
                         "page": page["page"],
@@ -338,6 +563,272 @@ class TextChunker:
         return chunks
 
 
+# ============================================================
+# ONNX EMBEDDER (int8 quantized)
+# ============================================================
+
+class OnnxEmbedder:
+    """
+    ONNX Runtime embedder for an int8-quantized sentence-transformers export.
+    Exposes the subset of SentenceTransformer.encode() that KnowledgeBase uses.
+    
+    Inference runs on a bare onnxruntime InferenceSession; optimum is only
+    needed to build the model directory, via OnnxEmbedder.export() (run
+    automatically by KnowledgeBase on first load) or by hand with:
+        optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 \\
+            --task feature-extraction ./minilm_onnx
+        optimum-cli onnxruntime quantize --avx512_vnni \\
+            --onnx_model ./minilm_onnx -o ./minilm_int8
+    """
+    
+    def __init__(self, model_dir: Path):
+        if ort is None:
+            raise ImportError(
+                "onnxruntime/transformers not installed. "
+                "Run: pip install onnxruntime transformers"
+            )
+        
+        model_dir = Path(model_dir)
+        file_name = "model_quantized.onnx"
+        if not (model_dir / file_name).exists():
+            file_name = "model.onnx"
+        
+        # Let ONNX Runtime use every core for the intra-op GEMMs
+        session_options = ort.SessionOptions()
+        session_options.intra_op_num_threads = os.cpu_count() or 1
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+        self.session = ort.InferenceSession(
+            str(model_dir / file_name),
+            sess_options=session_options,
+            providers=["CPUExecutionProvider"]
+        )
+        # BERT exports may or may not take token_type_ids
+        self._input_names = {i.name for i in self.session.get_inputs()}
+    
+    @staticmethod
+    def is_exported(model_dir: Path) -> bool:
+        """Whether model_dir holds a usable ONNX export."""
+        model_dir = Path(model_dir)
+        return any((model_dir / f).exists() for f in ("model_quantized.onnx", "model.onnx"))
+    
+    @staticmethod
+    def export(model_dir: Path, model_name: str = EMBEDDING_MODEL) -> None:
+        """
+        Export a sentence-transformers model to ONNX and quantize it to int8.
+        
+        Writes model.onnx (FP32), model_quantized.onnx (dynamic int8 weights)
+        and the tokenizer files into model_dir.
+        
+        Args:
+            model_dir: Output directory
+            model_name: Hugging Face model id (bare names get the
+                        sentence-transformers/ prefix)
+        """
+        if ORTModelForFeatureExtraction is None or ort is None:
+            raise ImportError(
+                "optimum not installed. Run: pip install optimum[onnxruntime]"
+            )
+        
+        if "/" not in model_name:
+            model_name = f"sentence-transformers/{model_name}"
+        
+        model_dir = Path(model_dir)
+        model_dir.mkdir(parents=True, exist_ok=True)
+        
+        model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        model.save_pretrained(str(model_dir))
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(str(model_dir))
+        
+        # Dynamic quantization: int8 weights, activations quantized on the fly
+        quantize_dynamic(
+            str(model_dir / "model.onnx"),
+            str(model_dir / "model_quantized.onnx"),
+            weight_type=QuantType.QInt8
+        )
+    
+    def encode(
+        self,
+        texts: list[str],
+        batch_size: int = 64,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = True
+    ) -> np.ndarray:
+        """
+        Embed texts with mean pooling + L2 normalization (matches all-MiniLM-L6-v2).
+        
+        Args:
+            texts: Texts to embed
+            batch_size: Texts per ONNX forward pass
+            show_progress_bar, convert_to_numpy, normalize_embeddings:
+                Accepted for SentenceTransformer API compatibility; output is
+                always a normalized NumPy array
+        
+        Returns:
+            float32 array of shape (len(texts), dim)
+        """
+        # Smart batching (as SentenceTransformer does): sort by length so each
+        # batch pads to similar lengths, then scatter rows back to input order
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        out = None
+        
+        for i in range(0, len(texts), batch_size):
+            idx = order[i:i + batch_size]
+            encoded = self.tokenizer(
+                [texts[j] for j in idx],
+                padding=True,
+                truncation=True,
+                max_length=EMBEDDING_MAX_SEQ_LENGTH,
+                return_tensors="np"
+            )
+            feeds = {k: v for k, v in encoded.items() if k in self._input_names}
+            hidden = self.session.run(None, feeds)[0]  # last_hidden_state
+            
+            mask = encoded["attention_mask"][..., np.newaxis].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            
+            if out is None:
+                out = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            out[idx] = pooled / np.clip(norms, 1e-12, None)
+        
+        if out is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return out
+
+
+# ============================================================
+# EMBEDDING CACHE (SQLite, content-addressed)
+# ============================================================
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by SHA-256 of (model, whitespace-normalized text).
+    Re-ingesting unchanged documents skips the encoder entirely.
+    
+    Vectors are stored as float16 (half the disk and I/O of float32; well
+    below the precision that matters for cosine ranking) and widened back to
+    float32 on read.
+    """
+    
+    _QUERY_BATCH = 500  # stay under SQLite's bound-parameter limit
+    
+    def __init__(self, cache_dir: Path, model_name: str):
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(cache_dir / "embeddings.sqlite3"), check_same_thread=False
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings_f16 "
+            "(key BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+    
+    def key(self, text: str) -> bytes:
+        """Cache key for a text under the current model."""
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{self.model_name}\x00{normalized}".encode()).digest()
+    
+    def get_many(self, keys: list[bytes]) -> dict[bytes, np.ndarray]:
+        """Look up cached vectors; missing keys are absent from the result."""
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), self._QUERY_BATCH):
+                batch = keys[i:i + self._QUERY_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings_f16 WHERE key IN ({placeholders})",
+                    batch
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+        return found
+    
+    def put_many(self, keys: list[bytes], vectors: np.ndarray) -> None:
+        """Store vectors (as float16) under their keys."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings_f16 (key, vector) VALUES (?, ?)",
+                ((k, v.astype(np.float16).tobytes()) for k, v in zip(keys, vectors))
+            )
+            self._conn.commit()
+
+
+# ============================================================
+# SEMANTIC QUERY CACHE (near-duplicate queries)
+# ============================================================
+
+class SemanticQueryCache:
+    """
+    Fixed-size ring buffer of recent query embeddings and their results.
+    
+    Embeddings live in one preallocated (capacity, dim) matrix, so a lookup
+    is a single matrix-vector product instead of a Python scan. Not
+    thread-safe on its own - KnowledgeBase guards it with its cache lock.
+    """
+    
+    def __init__(self, capacity: int, threshold: float = SEMANTIC_CACHE_THRESHOLD):
+        self.capacity = capacity
+        self.threshold = threshold
+        self._vecs: Optional[np.ndarray] = None  # allocated on first add (dim unknown)
+        self._params: list[Optional[tuple]] = [None] * capacity
+        self._results: list[Optional[list[dict]]] = [None] * capacity
+        self._next = 0
+        self._size = 0
+    
+    def lookup(self, query_emb: np.ndarray, params: tuple) -> Optional[list[dict]]:
+        """
+        Results of the most similar cached query with the same search params.
+        
+        Args:
+            query_emb: L2-normalized query embedding
+            params: Search parameters the results were produced with
+        
+        Returns:
+            Cached results if cosine similarity >= threshold, else None
+        """
+        if self._size == 0:
+            return None
+        
+        # Rows are L2-normalized, so the dot product is cosine similarity
+        sims = self._vecs[:self._size] @ query_emb
+        same_params = np.fromiter(
+            (p == params for p in self._params[:self._size]), dtype=bool, count=self._size
+        )
+        sims[~same_params] = -np.inf
+        
+        best = int(np.argmax(sims))
+        if sims[best] >= self.threshold:
+            return self._results[best]
+        return None
+    
+    def add(self, params: tuple, query_emb: np.ndarray, results: list[dict]) -> None:
+        """Insert an entry, overwriting the oldest one when full."""
+        if self._vecs is None:
+            self._vecs = np.zeros((self.capacity, len(query_emb)), dtype=np.float32)
+        
+        slot = self._next
+        self._vecs[slot] = query_emb
+        self._params[slot] = params
+        self._results[slot] = results
+        self._next = (slot + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+    
+    def clear(self) -> None:
+        """Drop all entries (the matrix is kept for reuse)."""
+        self._params = [None] * self.capacity
+        self._results = [None] * self.capacity
+        self._next = 0
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+
+
 # ============================================================
 # KNOWLEDGE BASE (ChromaDB + Embeddings) - SINGLETON
 # ============================================================
@@ -347,79 +838,240 @@ class KnowledgeBase:
     Main class for the RAG pipeline.
     Handles embedding, storage, and retrieval.
     
-    Use get_knowledge_base() to get the singleton instance.
+    Use get_knowledge_base() to get the shared instance.
     """
     
-    _instance: Optional["KnowledgeBase"] = None
-    _lock = threading.Lock()
-    
-    def __new__(cls, *args, **kwargs):
-        """Singleton pattern - only one instance allowed."""
-        if cls._instance is None:
-            with cls._lock:
-                if cls._instance is None:
-                    cls._instance = super().__new__(cls)
-                    cls._instance._initialized = False
-        return cls._instance
-    
     def __init__(
         self, 
         persist_directory: Optional[str] = None, 
         collection_name: Optional[str] = None
     ):
         """
-        Initialize the knowledge base (only runs once due to singleton).
+        Initialize the knowledge base (cheap: models load on first use).
         
         Args:
             persist_directory: Where to store ChromaDB
             collection_name: Name of the collection
         """
-        if self._initialized:
-            return
-        
         self.persist_dir = Path(persist_directory or CHROMA_PERSIST_DIR)
         self.collection_name = collection_name or COLLECTION_NAME
         
         self.persist_dir.mkdir(parents=True, exist_ok=True)
         
-        if SentenceTransformer is None:
-            raise ImportError(
-                "sentence-transformers not installed. "
-                "Run: pip install sentence-transformers"
-            )
+        # Embedder and ChromaDB are loaded on first use (see the
+        # embedder/collection properties) so stats/clear skip the model
+        self._load_lock = threading.Lock()
+        self._embedder = None
+        self._embed_cache: Optional[EmbeddingCache] = None
+        self._collection = None
+        self.client = None
+        
+        # ChromaDB's client isn't safe for concurrent writes
+        self._write_lock = threading.Lock()
         
-        logger.info(f"Loading embedding model: {EMBEDDING_MODEL}")
-        self.embedder = SentenceTransformer(EMBEDDING_MODEL)
+        # Search result caches - invalidated whenever the collection changes
+        self._cache_lock = threading.RLock()
+        self._result_cache: OrderedDict[tuple, list[dict]] = OrderedDict()
+        self._semantic_cache = SemanticQueryCache(SEMANTIC_CACHE_SIZE)
+        self._cache_stats = {"hits": 0, "semantic_hits": 0, "misses": 0}
+        # sha256(query) -> float16 embedding; shared by search and the response cache
+        self._query_embeddings: OrderedDict[bytes, np.ndarray] = OrderedDict()
         
+        # Cached document count for the query path. Upserts may overcount
+        # mid-ingestion (that only loosens the n_results clamp, which Chroma
+        # tolerates); refresh_count() re-syncs it after each ingestion.
+        self._doc_count = 0
+        # Distinct chunk sources, kept up to date by _upsert()/clear()
+        self._sources: set[str] = set()
+    
+    @property
+    def embedder(self):
+        """The embedding model, loaded on first access."""
+        if self._embedder is None:
+            with self._load_lock:
+                if self._embedder is None:
+                    embedder = self._load_embedder()
+                    backend = "onnx" if isinstance(embedder, OnnxEmbedder) else "torch"
+                    self._embed_cache = EmbeddingCache(
+                        self.persist_dir / "embed_cache", f"{EMBEDDING_MODEL}:{backend}"
+                    )
+                    self._embedder = embedder
+        return self._embedder
+    
+    @property
+    def embed_cache(self) -> EmbeddingCache:
+        """On-disk embedding cache (namespaced by the loaded embedder backend)."""
+        self.embedder
+        return self._embed_cache
+    
+    @property
+    def collection(self):
+        """The ChromaDB collection, connected on first access."""
+        if self._collection is None:
+            with self._load_lock:
+                if self._collection is None:
+                    self._connect()
+        return self._collection
+    
+    def _connect(self) -> None:
+        """Open the ChromaDB client and collection (caller holds _load_lock)."""
         logger.info(f"Connecting to ChromaDB at: {self.persist_dir}")
         self.client = chromadb.PersistentClient(
             path=str(self.persist_dir),
             settings=Settings(anonymized_telemetry=False)
         )
         
-        self.collection = self.client.get_or_create_collection(
+        collection = self.client.get_or_create_collection(
             name=self.collection_name,
-            metadata={"description": "Zed course knowledge base"}
+            metadata=dict(COLLECTION_METADATA)
         )
+        # Index settings are fixed at creation; older collections keep
+        # theirs (e.g. L2 distance) until rebuilt
+        current = collection.metadata or {}
+        stale = [
+            key for key, value in COLLECTION_METADATA.items()
+            if key.startswith("hnsw:") and current.get(key) != value
+        ]
+        if stale:
+            logger.warning(
+                f"⚠️ Collection '{self.collection_name}' predates the current index "
+                f"settings ({', '.join(stale)}); scores assume cosine. "
+                "Re-ingest after `python -m app.services.knowledge clear` to migrate."
+            )
         
-        logger.info(f"Knowledge base ready! ({self.collection.count()} documents)")
-        self._initialized = True
+        self._doc_count = collection.count()
+        if self._doc_count:
+            # One scan at connect time; get_stats() then never touches SQLite
+            metadatas = collection.get(include=["metadatas"])["metadatas"]
+            self._sources = {m.get("source", "unknown") for m in metadatas}
+        self._collection = collection
+        logger.info(f"Knowledge base ready! ({self._doc_count} documents)")
     
-    def _embed(self, texts: list[str]) -> list[list[float]]:
-        """Generate embeddings for a list of texts."""
-        return self.embedder.encode(texts, show_progress_bar=False).tolist()
+    @staticmethod
+    def _load_embedder():
+        """Load the int8 ONNX embedder on CPU (exporting it if needed), else PyTorch."""
+        try:
+            import torch
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            torch = None
+            SentenceTransformer = None
+        
+        has_cuda = torch is not None and torch.cuda.is_available()
+        
+        # An existing export is always used; only auto-export when there's no GPU
+        exported = OnnxEmbedder.is_exported(ONNX_EMBEDDING_DIR)
+        can_export = ORTModelForFeatureExtraction is not None and not has_cuda
+        if ONNX_EMBEDDER and ort is not None and (exported or can_export):
+            try:
+                if not exported:
+                    logger.info(f"Exporting {EMBEDDING_MODEL} to int8 ONNX: {ONNX_EMBEDDING_DIR}")
+                    OnnxEmbedder.export(ONNX_EMBEDDING_DIR)
+                
+                logger.info(f"Loading int8 ONNX embedding model: {ONNX_EMBEDDING_DIR}")
+                return OnnxEmbedder(ONNX_EMBEDDING_DIR)
+            except Exception as e:
+                logger.warning(f"⚠️ ONNX embedder unavailable, using PyTorch: {e}")
+        elif ONNX_EMBEDDER:
+            if ort is None:
+                reason = "onnxruntime not installed"
+            elif has_cuda:
+                reason = "no export found and auto-export is skipped on CUDA"
+            else:
+                reason = "no export found and optimum not installed (pip install optimum[onnxruntime])"
+            logger.info(f"ONNX_EMBEDDER is on but {reason} - using PyTorch")
+        
+        if SentenceTransformer is None:
+            raise ImportError(
+                "sentence-transformers not installed. "
+                "Run: pip install sentence-transformers"
+            )
+        
+        device = "cuda" if has_cuda else "cpu"
+        logger.info(f"Loading embedding model: {EMBEDDING_MODEL} ({device})")
+        embedder = SentenceTransformer(EMBEDDING_MODEL, device=device)
+        
+        if device == "cuda" and EMBEDDING_FP16:
+            embedder.half()
+        
+        return embedder
+    
+    def _embed(
+        self,
+        texts: list[str],
+        use_cache: bool = False,
+        show_progress_bar: bool = False
+    ) -> np.ndarray:
+        """
+        Generate embeddings for a list of texts, shape (len(texts), dim).
+        
+        Args:
+            texts: Texts to embed
+            use_cache: Consult/populate the on-disk embedding cache (ingestion)
+            show_progress_bar: Render the encoder's tqdm bar (CLI only)
+        """
+        # Identical texts (e.g. boilerplate slides repeated across decks) are
+        # embedded once and gathered back into place
+        unique: dict[str, int] = {}
+        inverse = [unique.setdefault(t, len(unique)) for t in texts]
+        if len(unique) < len(texts):
+            return self._embed(list(unique), use_cache, show_progress_bar)[inverse]
+        
+        if not use_cache or not texts:
+            return self._encode(texts, show_progress_bar)
+        
+        keys = [self.embed_cache.key(t) for t in texts]
+        cached = self.embed_cache.get_many(keys)
+        hits = [i for i, k in enumerate(keys) if k in cached]
+        missing = [i for i, k in enumerate(keys) if k not in cached]
+        
+        fresh = None
+        if missing:
+            fresh = self._encode([texts[i] for i in missing], show_progress_bar)
+            self.embed_cache.put_many([keys[i] for i in missing], fresh)
+        
+        logger.debug(f"Embedding cache: {len(hits)}/{len(texts)} hits")
+        if fresh is not None and not hits:
+            return fresh
+        
+        # Scatter hits and fresh rows into one preallocated (N, dim) buffer
+        dim = fresh.shape[1] if fresh is not None else len(cached[keys[0]])
+        out = np.empty((len(texts), dim), dtype=np.float32)
+        if hits:
+            out[hits] = [cached[keys[i]] for i in hits]
+        if fresh is not None:
+            out[missing] = fresh
+        return out
+    
+    def _encode(self, texts: list[str], show_progress_bar: bool = False) -> np.ndarray:
+        """Run the embedding model on texts."""
+        embeddings = self.embedder.encode(
+            texts,
+            batch_size=EMBEDDING_BATCH_SIZE,
+            show_progress_bar=show_progress_bar,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+        # FP16 models return float16 - ChromaDB stores float32
+        return embeddings.astype(np.float32, copy=False)
     
     # ----------------------------------------------------------
     # INGESTION METHODS
     # ----------------------------------------------------------
     
-    def ingest_chunks(self, chunks: list[dict], batch_size: int = 100) -> int:
+    def ingest_chunks(
+        self,
+        chunks: list[dict],
+        batch_size: int = 256,
+        show_progress: bool = False
+    ) -> int:
         """
         Add chunks to the vector store.
         
         Args:
             chunks: List of chunk dicts with 'id', 'text', 'metadata'
-            batch_size: How many to process at once
+            batch_size: How many chunks to embed and upsert per batch
+            show_progress: Show the encoder's progress bar (CLI only)
         
         Returns:
             Number of chunks ingested
@@ -429,30 +1081,99 @@ class KnowledgeBase:
             return 0
         
         logger.info(f"Ingesting {len(chunks)} chunks...")
+        return self.ingest_stream(chunks, batch_size, show_progress)
+    
+    def ingest_stream(
+        self,
+        chunks: Iterable[dict],
+        batch_size: int = 256,
+        show_progress: bool = False
+    ) -> int:
+        """
+        Add chunks from an iterator, embedding and upserting one batch at a time.
         
-        for i in range(0, len(chunks), batch_size):
-            batch = chunks[i:i + batch_size]
-            
-            ids = [c["id"] for c in batch]
-            texts = [c["text"] for c in batch]
-            metadatas = [c["metadata"] for c in batch]
-            
-            embeddings = self._embed(texts)
-            
+        Only a couple of batches (and their embeddings) are held in memory, so
+        large decks can be piped straight from PDFParser.iter_pages() through
+        TextChunker.iter_chunks(). Embedding batch i+1 (CPU/GPU-bound) overlaps
+        with the ChromaDB upsert of batch i (disk-bound) on a single writer
+        thread, which also keeps writes serialized.
+        
+        Args:
+            chunks: Iterable of chunk dicts with 'id', 'text', 'metadata'
+            batch_size: How many chunks to embed and upsert at once
+            show_progress: Show the encoder's progress bar (CLI only)
+        
+        Returns:
+            Number of chunks ingested
+        """
+        logger.info(f"Ingesting chunks in batches of {batch_size}...")
+        
+        total = 0
+        n_batches = 0
+        pending = None
+        
+        try:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="kb-upsert") as writer:
+                for batch in self._batched(chunks, batch_size):
+                    embeddings = self._embed(
+                        [c["text"] for c in batch], use_cache=True, show_progress_bar=show_progress
+                    )
+                    
+                    # At most one upsert in flight: wait for batch i before queuing i+1
+                    if pending is not None:
+                        pending.result()
+                    pending = writer.submit(self._upsert, batch, embeddings)
+                    
+                    total += len(batch)
+                    n_batches += 1
+                    if n_batches % INGEST_LOG_EVERY == 0:
+                        logger.info(f"Ingested {total} chunks ({n_batches} batches)...")
+                
+                if pending is not None:
+                    pending.result()
+        finally:
+            # Even if a later batch failed, earlier ones may be in the
+            # collection: drop stale search results and fix the upsert count
+            if pending is not None:
+                self._invalidate_query_cache()
+                self.refresh_count()
+        
+        if not total:
+            logger.warning("No chunks to ingest")
+            return 0
+        
+        logger.info(f"Ingestion complete! Total: {self._doc_count}")
+        return total
+    
+    @staticmethod
+    def _batched(items: Iterable[dict], batch_size: int) -> Iterator[list[dict]]:
+        """Group an iterable into lists of up to batch_size items."""
+        batch: list[dict] = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def _upsert(self, batch: list[dict], embeddings: np.ndarray) -> None:
+        """Write one batch of chunks and their embeddings to ChromaDB."""
+        with self._write_lock:
             self.collection.upsert(
-                ids=ids,
-                documents=texts,
+                ids=[c["id"] for c in batch],
+                documents=[c["text"] for c in batch],
                 embeddings=embeddings,
-                metadatas=metadatas
+                metadatas=[c["metadata"] for c in batch]
             )
-        
-        logger.info(f"Ingestion complete! Total: {self.collection.count()}")
-        return len(chunks)
+            self._doc_count += len(batch)
+            self._sources.update(c["metadata"].get("source", "unknown") for c in batch)
     
     def ingest_pdf(
         self, 
         pdf_path: str, 
-        chunking_strategy: ChunkingStrategy = "page"
+        chunking_strategy: ChunkingStrategy = "page",
+        show_progress: bool = False
     ) -> int:
         """
         Ingest a single PDF.
@@ -460,19 +1181,23 @@ class KnowledgeBase:
         Args:
             pdf_path: Path to the PDF file
             chunking_strategy: "page", "size", or "topic"
+            show_progress: Show the encoder's progress bar (CLI only)
         
         Returns:
             Number of chunks ingested
         """
-        pages = PDFParser.extract_text_from_pdf(pdf_path)
-        chunks = TextChunker.chunk(pages, strategy=chunking_strategy)
-        return self.ingest_chunks(chunks)
+        pages = PDFParser.iter_pages(pdf_path)
+        return self.ingest_stream(
+            TextChunker.iter_chunks(pages, strategy=chunking_strategy),
+            show_progress=show_progress
+        )
     
     def ingest_directory(
         self, 
         directory: str, 
         chunking_strategy: ChunkingStrategy = "page",
-        recursive: bool = True
+        recursive: bool = True,
+        show_progress: bool = False
     ) -> int:
         """
         Ingest all PDFs from a directory.
@@ -481,13 +1206,16 @@ class KnowledgeBase:
             directory: Path to directory containing PDFs
             chunking_strategy: "page", "size", or "topic"
             recursive: Whether to search subdirectories
+            show_progress: Show the encoder's progress bar (CLI only)
         
         Returns:
             Number of chunks ingested
         """
-        pages = PDFParser.extract_from_directory(directory, recursive=recursive)
-        chunks = TextChunker.chunk(pages, strategy=chunking_strategy)
-        return self.ingest_chunks(chunks)
+        pages = PDFParser.iter_from_directory(directory, recursive=recursive)
+        return self.ingest_stream(
+            TextChunker.iter_chunks(pages, strategy=chunking_strategy),
+            show_progress=show_progress
+        )
     
     def ingest_text(
         self, 
@@ -506,7 +1234,7 @@ class KnowledgeBase:
         Returns:
             Number of chunks ingested (1)
         """
-        chunk_id = hashlib.md5(f"{source}:{text[:100]}".encode()).hexdigest()[:12]
+        chunk_id = make_chunk_id(f"{source}:{text[:100]}".encode())
         
         chunk = {
             "id": chunk_id,
@@ -523,12 +1251,59 @@ class KnowledgeBase:
     # ----------------------------------------------------------
     # RETRIEVAL METHODS
     # ----------------------------------------------------------
-    
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        L2-normalized embedding of a single query (same model as search()).
+
+        Memoized, so the search and the response cache embed a turn once.
+
+        Args:
+            query: Query text
+
+        Returns:
+            1-D float32 embedding
+        """
+        return self._embed_queries([query])[0]
+
+    def _embed_queries(self, queries: list[str]) -> np.ndarray:
+        """Embed queries through the in-memory memo; misses share one encode call."""
+        keys = [hashlib.sha256(q.encode()).digest() for q in queries]
+        found: dict[int, np.ndarray] = {}
+        with self._cache_lock:
+            for i, key in enumerate(keys):
+                emb = self._query_embeddings.get(key)
+                if emb is not None:
+                    self._query_embeddings.move_to_end(key)
+                    found[i] = emb
+        
+        missing = [i for i in range(len(queries)) if i not in found]
+        if not missing:
+            return np.stack([found[i] for i in range(len(queries))]).astype(np.float32)
+        
+        fresh = self._embed([queries[i] for i in missing])
+        with self._cache_lock:
+            for i, emb in zip(missing, fresh):
+                self._query_embeddings[keys[i]] = emb.astype(np.float16)
+                self._query_embeddings.move_to_end(keys[i])
+            while len(self._query_embeddings) > QUERY_EMBED_CACHE_SIZE:
+                self._query_embeddings.popitem(last=False)
+        
+        if not found:
+            return fresh
+        out = np.empty((len(queries), fresh.shape[1]), dtype=np.float32)
+        out[missing] = fresh
+        for i, emb in found.items():
+            out[i] = emb
+        return out
+
     def search(
         self, 
         query: str, 
         n_results: int = 3,
-        score_threshold: float = 0.0
+        score_threshold: float = 0.0,
+        mmr_lambda: Optional[float] = None,
+        return_scores: bool = True
     ) -> list[dict]:
         """
         🎯 MAIN RETRIEVAL FUNCTION
@@ -539,41 +1314,268 @@ class KnowledgeBase:
             query: The user's question/query text
             n_results: Number of results to return
             score_threshold: Minimum similarity score (0-1)
+            mmr_lambda: If set, re-rank candidates with Maximal Marginal Relevance
+                        (1.0 = pure relevance, 0.0 = pure diversity)
+            return_scores: If False, skip fetching distances from ChromaDB
+                           (unless score_threshold needs them) and set 'score'
+                           to None - for callers that feed chunks straight
+                           to the LLM
         
         Returns:
             List of dicts with 'text', 'source', 'page', 'score'
         """
-        if self.collection.count() == 0:
-            return []
+        return self.search_batch(
+            [query], n_results, score_threshold, mmr_lambda, return_scores
+        )[0]
+    
+    def search_batch(
+        self,
+        queries: list[str],
+        n_results: int = 3,
+        score_threshold: float = 0.0,
+        mmr_lambda: Optional[float] = None,
+        return_scores: bool = True
+    ) -> list[list[dict]]:
+        """
+        Semantic search for several queries at once.
+        
+        Cache misses are embedded in a single encode call and sent to ChromaDB
+        as one multi-vector query.
+        
+        Args:
+            queries: Query texts (e.g. rephrasings or sub-questions)
+            n_results: Number of results to return per query
+            score_threshold: Minimum similarity score (0-1)
+            mmr_lambda: If set, re-rank candidates with Maximal Marginal Relevance
+            return_scores: If False, results carry 'score': None (see search())
+        
+        Returns:
+            One result list per query, in input order
+        """
+        doc_count = self.count
+        if doc_count == 0:
+            return [[] for _ in queries]
+        
+        params = (n_results, score_threshold, mmr_lambda, return_scores)
+        output: list[Optional[list[dict]]] = [None] * len(queries)
+        
+        # Exact cache is keyed on the whitespace-collapsed query. Case is kept:
+        # EMBEDDING_MODEL may be cased, so "Paris" and "paris" can retrieve
+        # different chunks. Near-duplicates are left to the semantic cache
+        query_keys = [self._normalize_query(q) for q in queries]
+        
+        misses = []
+        with self._cache_lock:
+            for i, query_key in enumerate(query_keys):
+                cache_key = (query_key, *params)
+                if cache_key in self._result_cache:
+                    self._result_cache.move_to_end(cache_key)
+                    output[i] = self._copy_results(self._result_cache[cache_key])
+                else:
+                    misses.append(i)
+            self._cache_stats["hits"] += len(queries) - len(misses)
+        
+        if not misses:
+            return output
+        
+        query_embeddings = self._embed_queries([queries[i] for i in misses])
+        
+        pending = []
+        for i, query_embedding in zip(misses, query_embeddings):
+            cached = self._semantic_lookup(query_embedding, params)
+            if cached is not None:
+                self._cache_results((query_keys[i], *params), None, cached)
+                output[i] = self._copy_results(cached)
+            else:
+                pending.append((i, query_embedding))
+        
+        with self._cache_lock:
+            self._cache_stats["semantic_hits"] += len(misses) - len(pending)
+            self._cache_stats["misses"] += len(pending)
+        
+        if not pending:
+            return output
         
-        query_embedding = self._embed([query])[0]
+        use_mmr = mmr_lambda is not None
+        fetch_k = n_results * MMR_FETCH_MULTIPLIER if use_mmr else n_results
+        include = ["documents", "metadatas"]
+        if return_scores or score_threshold > 0:
+            include.append("distances")
+        if use_mmr:
+            include.append("embeddings")
         
         results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=min(n_results, self.collection.count()),
-            include=["documents", "metadatas", "distances"]
+            query_embeddings=np.stack([emb for _, emb in pending]),
+            n_results=min(fetch_k, doc_count),
+            include=include
         )
         
-        formatted = []
-        for i in range(len(results["ids"][0])):
-            distance = results["distances"][0][i]
-            similarity = 1 / (1 + distance)
-            
-            if similarity >= score_threshold:
-                formatted.append({
-                    "text": results["documents"][0][i],
-                    "source": results["metadatas"][0][i].get("source", "unknown"),
-                    "page": results["metadatas"][0][i].get("page", 0),
-                    "score": round(similarity, 3),
-                    "metadata": results["metadatas"][0][i]
-                })
+        for row, (i, query_embedding) in enumerate(pending):
+            formatted = self._format_results(
+                results, row, query_embedding, n_results, score_threshold, mmr_lambda,
+                return_scores
+            )
+            self._cache_results((query_keys[i], *params), query_embedding, formatted)
+            output[i] = self._copy_results(formatted)
+        
+        return output
+    
+    def _format_results(
+        self,
+        results: dict,
+        row: int,
+        query_embedding: np.ndarray,
+        n_results: int,
+        score_threshold: float,
+        mmr_lambda: Optional[float],
+        return_scores: bool = True
+    ) -> list[dict]:
+        """Turn one row of a ChromaDB query response into result dicts."""
+        docs = results["documents"][row]
+        metas = results["metadatas"][row]
+        
+        sims = None
+        if results.get("distances") is not None:
+            sims = np.maximum(0.0, 1.0 - np.asarray(results["distances"][row], dtype=np.float64))
+        
+        order = range(len(docs))
+        if mmr_lambda is not None:
+            order = self._mmr_select(
+                query_embedding,
+                np.ascontiguousarray(results["embeddings"][row], dtype=np.float32),
+                n_results,
+                mmr_lambda
+            )
+        
+        # Threshold with one vectorized comparison; only survivors get dicts
+        scores = None
+        if sims is not None:
+            keep = sims >= score_threshold
+            if mmr_lambda is None:
+                order = np.flatnonzero(keep).tolist()
+            else:
+                order = [i for i in order if keep[i]]
+            if return_scores:
+                # Round the whole row at once and unbox to Python floats
+                scores = sims.round(3).tolist()
+        
+        formatted = [
+            {
+                "text": docs[i],
+                "source": metas[i].get("source", "unknown"),
+                "page": metas[i].get("page", 0),
+                "score": scores[i] if scores is not None else None,
+                "metadata": metas[i]
+            }
+            for i in order
+        ]
         
         return formatted
     
+    @staticmethod
+    def _copy_results(results: list[dict]) -> list[dict]:
+        """Caller-owned copies of cached result dicts (and their metadata)."""
+        return [{**r, "metadata": dict(r["metadata"])} for r in results]
+    
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Cache key form of a query: whitespace collapsed, case preserved."""
+        return " ".join(query.split())
+    
+    def cache_info(self) -> dict:
+        """Search cache statistics (hit counts and current sizes)."""
+        with self._cache_lock:
+            return {
+                **self._cache_stats,
+                "size": len(self._result_cache),
+                "maxsize": QUERY_CACHE_SIZE,
+                "semantic_size": len(self._semantic_cache)
+            }
+    
+    def _semantic_lookup(self, query_emb: np.ndarray, params: tuple) -> Optional[list[dict]]:
+        """Return cached results for a near-identical earlier query, if any."""
+        with self._cache_lock:
+            return self._semantic_cache.lookup(query_emb, params)
+    
+    def _cache_results(
+        self,
+        cache_key: tuple,
+        query_emb: Optional[np.ndarray],
+        results: list[dict]
+    ) -> None:
+        """Store search results in the exact cache (and semantic cache if query_emb given)."""
+        with self._cache_lock:
+            self._result_cache[cache_key] = results
+            self._result_cache.move_to_end(cache_key)
+            if len(self._result_cache) > QUERY_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+            if query_emb is not None:
+                self._semantic_cache.add(cache_key[1:], query_emb, results)
+    
+    def _invalidate_query_cache(self) -> None:
+        """Drop cached search results (call after any collection change)."""
+        with self._cache_lock:
+            self._result_cache.clear()
+            self._semantic_cache.clear()
+    
+    @staticmethod
+    def _mmr_select(
+        query_emb: np.ndarray,
+        doc_embs: np.ndarray,
+        k: int,
+        lambda_mult: float
+    ) -> list[int]:
+        """
+        Maximal Marginal Relevance selection over candidate embeddings.
+        
+        Similarities are computed once as matrix products; each selection
+        step is a vectorized argmax over the running max-similarity vector.
+        
+        Args:
+            query_emb: Query embedding, shape (dim,)
+            doc_embs: Candidate embeddings, shape (n, dim)
+            k: Number of candidates to select
+            lambda_mult: Relevance/diversity trade-off
+        
+        Returns:
+            Indices into doc_embs, in selection order
+        """
+        n = len(doc_embs)
+        if n == 0:
+            return []
+        
+        doc_norms = np.linalg.norm(doc_embs, axis=1)
+        doc_embs = doc_embs / np.clip(doc_norms, 1e-12, None)[:, np.newaxis]
+        query_emb = query_emb / max(float(np.linalg.norm(query_emb)), 1e-12)
+        
+        query_sim = doc_embs @ query_emb    # (n,)
+        doc_sim = doc_embs @ doc_embs.T     # (n, n)
+        
+        selected = [int(np.argmax(query_sim))]
+        max_sim = doc_sim[selected[0]].copy()
+        
+        for _ in range(min(k, n) - 1):
+            mmr = lambda_mult * query_sim - (1 - lambda_mult) * max_sim
+            mmr[selected] = -np.inf
+            idx = int(np.argmax(mmr))
+            selected.append(idx)
+            np.maximum(max_sim, doc_sim[idx], out=max_sim)
+        
+        return selected
+    
     # Alias for backward compatibility
-    def retrieve_context(self, query: str, n_results: int = 3) -> list[dict]:
+    def retrieve_context(
+        self,
+        query: str,
+        n_results: int = 3,
+        return_scores: bool = True
+    ) -> list[dict]:
         """Alias for search() - backward compatibility."""
-        return self.search(query, n_results)
+        return self.search(query, n_results, return_scores=return_scores)
+    
+    def retrieve_context_batch(self, queries: list[str], n_results: int = 3) -> list[list[dict]]:
+        """Alias for search_batch()."""
+        return self.search_batch(queries, n_results)
     
     # ----------------------------------------------------------
     # UTILITY METHODS
@@ -581,39 +1583,116 @@ class KnowledgeBase:
     
     def clear(self) -> None:
         """Clear all documents from the collection."""
-        self.client.delete_collection(self.collection_name)
-        self.collection = self.client.create_collection(
-            name=self.collection_name,
-            metadata={"description": "Zed course knowledge base"}
-        )
+        self.collection  # connect (no embedder needed)
+        with self._write_lock:
+            self.client.delete_collection(self.collection_name)
+            self._collection = self.client.create_collection(
+                name=self.collection_name,
+                metadata=dict(COLLECTION_METADATA)
+            )
+            self._doc_count = 0
+            self._sources = set()
+        self._invalidate_query_cache()
         logger.info("Knowledge base cleared!")
     
     def get_stats(self) -> dict:
         """Get statistics about the knowledge base."""
-        count = self.collection.count()
-        
-        sources = set()
-        if count > 0:
-            all_docs = self.collection.get(include=["metadatas"])
-            sources = set(m.get("source", "unknown") for m in all_docs["metadatas"])
+        count = self.refresh_count()
         
         return {
             "total_chunks": count,
-            "sources": list(sources),
+            "sources": list(self._sources),
             "persist_directory": str(self.persist_dir),
             "embedding_model": EMBEDDING_MODEL
         }
     
+    def refresh_count(self) -> int:
+        """Re-read the document count from ChromaDB (corrects upsert overcounting)."""
+        with self._write_lock:
+            self._doc_count = self.collection.count()
+        return self._doc_count
+    
     @property
     def count(self) -> int:
-        """Number of documents in the collection."""
-        return self.collection.count()
+        """Number of documents in the collection (cached; see refresh_count())."""
+        self.collection
+        return self._doc_count
+
+
+# ============================================================
+# RETRIEVAL BATCHER (cross-session query coalescing)
+# ============================================================
+
+class RetrievalBatcher:
+    """
+    Coalesces concurrent search() calls into batched KnowledgeBase queries.
+    
+    Callers on different threads (e.g. concurrent WebSocket sessions) enqueue
+    their query and block on a Future. One worker thread drains everything
+    queued at that moment into a single search_batch() call - one encode and
+    one multi-vector ChromaDB query instead of N. Queries that arrive while a
+    batch is running form the next batch, so a lone caller never waits on a
+    coalescing timer.
+    """
+    
+    def __init__(self, kb: KnowledgeBase, max_batch: int = RETRIEVAL_MAX_BATCH):
+        self.kb = kb
+        self.max_batch = max_batch
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._worker = threading.Thread(target=self._run, name="kb-retrieval", daemon=True)
+        self._worker.start()
+    
+    def search(self, query: str, n_results: int = 3) -> list[dict]:
+        """
+        Semantic search through the shared batch (same results as KnowledgeBase.search).
+        
+        Args:
+            query: Search query
+            n_results: Number of results to return
+        
+        Returns:
+            List of result dicts with text, source, page, score
+        """
+        future: Future = Future()
+        self._queue.put((query, n_results, future))
+        return future.result()
+    
+    def _run(self) -> None:
+        """Worker loop: drain the queue, run one search_batch per n_results value."""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            groups: dict[int, list[tuple]] = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            
+            for n_results, items in groups.items():
+                try:
+                    results = self.kb.search_batch([q for q, _, _ in items], n_results)
+                except Exception as e:
+                    for _, _, future in items:
+                        future.set_exception(e)
+                    continue
+                for (_, _, future), result in zip(items, results):
+                    future.set_result(result)
+            
+            if len(batch) > 1:
+                logger.debug(f"Retrieval batch: {len(batch)} queries")
 
 
 # ============================================================
 # SINGLETON ACCESSOR FUNCTIONS
 # ============================================================
 
+_knowledge_base: Optional[KnowledgeBase] = None
+_knowledge_base_lock = threading.Lock()
+
+
 def get_knowledge_base() -> KnowledgeBase:
     """
     Get the global KnowledgeBase singleton instance.
@@ -627,19 +1706,67 @@ def get_knowledge_base() -> KnowledgeBase:
         kb = get_knowledge_base()
         results = kb.search("What is the midterm worth?")
     """
-    return KnowledgeBase()
+    # Fast path is a single global read; the lock only guards first creation
+    global _knowledge_base
+    kb = _knowledge_base
+    if kb is None:
+        with _knowledge_base_lock:
+            if _knowledge_base is None:
+                _knowledge_base = KnowledgeBase()
+            kb = _knowledge_base
+    return kb
 
 
-def retrieve_context(query: str, n_results: int = 3) -> list[dict]:
+def retrieve_context(query: str, n_results: int = 3, return_scores: bool = True) -> list[dict]:
     """
     Quick retrieval function for backward compatibility.
     
+    Pass return_scores=False when the chunks go straight into the prompt;
+    ChromaDB then skips materializing distances ('score' is None).
+    
     Usage:
         from app.services.knowledge import retrieve_context
         
         results = retrieve_context("What is the midterm worth?")
     """
-    return get_knowledge_base().search(query, n_results)
+    return get_knowledge_base().search(query, n_results, return_scores=return_scores)
+
+
+def retrieve_context_batch(queries: list[str], n_results: int = 3) -> list[list[dict]]:
+    """
+    Retrieve context for several queries with one embedding pass and one
+    ChromaDB query.
+    
+    Usage:
+        from app.services.knowledge import retrieve_context_batch
+        
+        results = retrieve_context_batch(["midterm weight", "final exam date"])
+    """
+    return get_knowledge_base().search_batch(queries, n_results)
+
+
+# ============================================================
+# BACKGROUND WARM-UP
+# ============================================================
+
+def _warm_load() -> None:
+    """Load the embedder and collection off the request path so the first query skips both."""
+    try:
+        kb = get_knowledge_base()
+        kb.embedder
+        kb.collection
+    except Exception as e:
+        logger.warning(f"⚠️ Knowledge base warm-up failed: {e}")
+
+
+# Not in PDF worker processes (which re-import this module under spawn) or
+# the CLI, whose stats/clear commands never need the embedder
+if (
+    not LAZY_LOAD_KB
+    and __name__ != "__main__"
+    and multiprocessing.parent_process() is None
+):
+    threading.Thread(target=_warm_load, name="kb-warmup", daemon=True).start()
 
 
 # ============================================================
@@ -667,10 +1794,10 @@ if __name__ == "__main__":
             strategy = sys.argv[3] if len(sys.argv) > 3 else "page"
             
             if os.path.isfile(path):
-                count = kb.ingest_pdf(path, chunking_strategy=strategy)
+                count = kb.ingest_pdf(path, chunking_strategy=strategy, show_progress=True)
                 print(f"✅ Ingested {count} chunks from {path}")
             elif os.path.isdir(path):
-                count = kb.ingest_directory(path, chunking_strategy=strategy)
+                count = kb.ingest_directory(path, chunking_strategy=strategy, show_progress=True)
                 print(f"✅ Ingested {count} chunks from {path}")
             else:
                 print(f"❌ Path not found: {path}")
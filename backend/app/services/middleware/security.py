@@ -11,11 +11,20 @@ Provides:
 import re
 import time
 import hashlib
-from collections import defaultdict
+import threading
 from typing import Optional
 from fastapi import HTTPException, Request
 
 
+# PII scrubbing for logs: emails and phone numbers in a single pass
+_PII_RE = re.compile(
+    r'(?P<email>\b[\w.-]+@[\w.-]+\.\w+\b)'
+    r'|(?P<phone>\b\d{3}[-.]?\d{3}[-.]?\d{4}\b)'
+)
+_PII_REPLACEMENTS = {"email": "[EMAIL]", "phone": "[PHONE]"}
+_PII_MIN_LENGTH = 5  # shortest possible match: "a@b.c"
+
+
 class SecurityGuard:
     """
     Security middleware for protecting ZED from malicious inputs.
@@ -68,9 +77,13 @@ class SecurityGuard:
     
     # Compiled patterns for performance
     _compiled_patterns = None
+    _combined_pattern = None
     
-    # Rate limiting storage (in production, use Redis)
-    _rate_limits: dict = defaultdict(lambda: {"count": 0, "window_start": 0.0})
+    # Rate limiting storage (in production, use Redis): request count per
+    # (user_id, window_seconds, window_index) fixed-window bucket
+    _rate_limits: dict[tuple[str, int, int], int] = {}
+    _rate_lock = threading.Lock()
+    _RATE_LIMIT_GC_THRESHOLD = 1024  # sweep expired buckets past this many keys
     
     # Configuration
     MAX_INPUT_LENGTH = 1000
@@ -87,6 +100,16 @@ class SecurityGuard:
             ]
         return cls._compiled_patterns
     
+    @classmethod
+    def _get_combined_pattern(cls):
+        """All forbidden patterns as one alternation - a single pass per input."""
+        if cls._combined_pattern is None:
+            cls._combined_pattern = re.compile(
+                "|".join(f"(?:{pattern})" for pattern in cls.FORBIDDEN_PATTERNS),
+                re.IGNORECASE
+            )
+        return cls._combined_pattern
+    
     @classmethod
     def validate_input(cls, text: str, max_length: int = None) -> bool:
         """
@@ -115,14 +138,17 @@ class SecurityGuard:
             )
         
         # B. Prompt Injection Check (Security)
-        for pattern in cls._get_compiled_patterns():
-            if pattern.search(text):
-                print(f"⚠️ SECURITY ALERT: Blocked injection attempt matching: '{pattern.pattern}'")
-                print(f"   Input snippet: '{text[:100]}...'")
-                raise HTTPException(
-                    status_code=403, 
-                    detail="I can't do that, Dave."
-                )
+        if cls._get_combined_pattern().search(text):
+            # Rare path: find which pattern fired for the audit log
+            matched = next(
+                p.pattern for p in cls._get_compiled_patterns() if p.search(text)
+            )
+            print(f"⚠️ SECURITY ALERT: Blocked injection attempt matching: '{matched}'")
+            print(f"   Input snippet: '{text[:100]}...'")
+            raise HTTPException(
+                status_code=403, 
+                detail="I can't do that, Dave."
+            )
         
         return True
     
@@ -151,28 +177,37 @@ class SecurityGuard:
         max_req = max_requests or cls.RATE_LIMIT_MAX_REQUESTS
         
         current_time = time.time()
-        user_data = cls._rate_limits[user_id]
+        bucket = int(current_time // window)
+        window_start = bucket * window
+        key = (user_id, window, bucket)
         
-        # Check if we're in a new window
-        if current_time - user_data["window_start"] >= window:
-            # Reset counter for new window
-            cls._rate_limits[user_id] = {
-                "count": 1,
-                "window_start": current_time
-            }
-            return 1, current_time
-        
-        # Same window - check limit
-        if user_data["count"] >= max_req:
-            wait_time = int(window - (current_time - user_data["window_start"]))
-            raise HTTPException(
-                status_code=429, 
-                detail=f"Rate limit exceeded. Please wait {wait_time} seconds."
-            )
+        # Read-modify-write under a lock so concurrent requests can't both
+        # slip under the limit
+        with cls._rate_lock:
+            count = cls._rate_limits.get(key, 0)
+            if count >= max_req:
+                wait_time = int(window_start + window - current_time) + 1
+                raise HTTPException(
+                    status_code=429, 
+                    detail=f"Rate limit exceeded. Please wait {wait_time} seconds."
+                )
+            
+            cls._rate_limits[key] = count + 1
+            
+            if len(cls._rate_limits) > cls._RATE_LIMIT_GC_THRESHOLD:
+                cls._sweep_expired(current_time)
         
-        # Increment counter
-        cls._rate_limits[user_id]["count"] += 1
-        return cls._rate_limits[user_id]["count"], user_data["window_start"]
+        return count + 1, window_start
+    
+    @classmethod
+    def _sweep_expired(cls, current_time: float) -> None:
+        """Drop buckets whose window has passed (caller holds _rate_lock)."""
+        expired = [
+            key for key in cls._rate_limits
+            if key[2] < int(current_time // key[1])
+        ]
+        for key in expired:
+            del cls._rate_limits[key]
     
     @classmethod
     def get_user_id(cls, request: Request) -> str:
@@ -189,9 +224,11 @@ class SecurityGuard:
         client_ip = request.client.host if request.client else "unknown"
         user_agent = request.headers.get("user-agent", "")
         
-        # Hash for privacy
+        # Hash for privacy (64-bit BLAKE2b). The ID is still 16 hex chars, but
+        # the values differ from the old truncated SHA-256, so per-user state
+        # and rate-limit keys stored under old IDs are orphaned.
         identifier = f"{client_ip}:{user_agent}"
-        return hashlib.sha256(identifier.encode()).hexdigest()[:16]
+        return hashlib.blake2b(identifier.encode(), digest_size=8).hexdigest()
     
     @classmethod
     def sanitize_for_logging(cls, text: str, max_length: int = 200) -> str:
@@ -207,15 +244,16 @@ class SecurityGuard:
             sanitized += "..."
         
         # Remove potential PII patterns (basic)
-        sanitized = re.sub(r'\b[\w.-]+@[\w.-]+\.\w+\b', '[EMAIL]', sanitized)
-        sanitized = re.sub(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b', '[PHONE]', sanitized)
+        if len(sanitized) >= _PII_MIN_LENGTH:
+            sanitized = _PII_RE.sub(lambda m: _PII_REPLACEMENTS[m.lastgroup], sanitized)
         
         return sanitized
     
     @classmethod
     def reset_rate_limits(cls):
         """Clear all rate limit data (for testing)."""
-        cls._rate_limits.clear()
+        with cls._rate_lock:
+            cls._rate_limits.clear()
 
 
 class ContentFilter:
@@ -235,11 +273,12 @@ class ContentFilter:
     
     @classmethod
     def _get_compiled_topics(cls):
+        """All blocked topics as one alternation - a single pass per input."""
         if cls._compiled_topics is None:
-            cls._compiled_topics = [
-                re.compile(pattern, re.IGNORECASE)
-                for pattern in cls.BLOCKED_TOPICS
-            ]
+            cls._compiled_topics = re.compile(
+                "|".join(f"(?:{pattern})" for pattern in cls.BLOCKED_TOPICS),
+                re.IGNORECASE
+            )
         return cls._compiled_topics
     
     @classmethod
@@ -253,13 +292,12 @@ class ContentFilter:
         Raises:
             HTTPException: If content violates academic integrity
         """
-        for pattern in cls._get_compiled_topics():
-            if pattern.search(text):
-                raise HTTPException(
-                    status_code=403,
-                    detail="ZED is here to help you learn, not to do your work for you. "
-                           "Try asking me to explain the concept instead!"
-                )
+        if cls._get_compiled_topics().search(text):
+            raise HTTPException(
+                status_code=403,
+                detail="ZED is here to help you learn, not to do your work for you. "
+                       "Try asking me to explain the concept instead!"
+            )
         return True
 
 
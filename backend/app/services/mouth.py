@@ -1,8 +1,19 @@
 import os
+import queue
 import threading
 import pyaudio
 from elevenlabs.client import ElevenLabs
 
+# Playback format (matches ElevenLabs "pcm_22050": 16-bit mono)
+SAMPLE_RATE = 22050
+FRAMES_PER_BUFFER = 1024
+# Coalesce streamed chunks into ~93 ms writes to cut PortAudio calls
+WRITE_CHUNK_BYTES = 4096
+# Network chunks buffered ahead of playback to ride out jitter
+PREFETCH_CHUNKS = 8
+# How often blocked prefetch/playback waits re-check for interruption (seconds)
+POLL_INTERVAL = 0.05
+
 class Mouth:
     def __init__(self):
         # 1. Initialize Client
@@ -20,7 +31,11 @@ class Mouth:
         # 3. Interruption state
         self._interrupt_event = threading.Event()
         self._is_speaking = False
+        
+        # 4. Playback device - opened on first speak() and kept open
         self._audio = None
+        self._stream = None
+        self._playback_lock = threading.Lock()
 
     def speak(self, text: str, interrupt_event: threading.Event = None):
         """
@@ -40,6 +55,12 @@ class Mouth:
 
         print(f"👄 Mouth speaking: '{text[:50]}...'")
         
+        # Concurrent speak() calls take turns on the shared output stream
+        with self._playback_lock:
+            self._speak_locked(text, stop_event)
+    
+    def _speak_locked(self, text: str, stop_event: threading.Event):
+        """Stream TTS audio to the shared output stream (caller holds the lock)."""
         try:
             # 1. Generate the audio stream from ElevenLabs (use stream method)
             audio_stream = self.client.text_to_speech.stream(
@@ -49,34 +70,90 @@ class Mouth:
                 output_format="pcm_22050",  # Raw PCM for PyAudio
             )
             
-            # 2. Initialize PyAudio for playback
-            self._audio = pyaudio.PyAudio()
-            stream = self._audio.open(
-                format=pyaudio.paInt16,
-                channels=1,
-                rate=22050,
-                output=True
+            # 2. Reuse the persistent output stream (host API init is slow)
+            stream = self._get_stream()
+            if stream.is_stopped():
+                stream.start_stream()
+            
+            # 3. Pull the network stream on a background thread so a slow
+            # socket and a blocking device write don't stall each other
+            chunks = queue.Queue(maxsize=PREFETCH_CHUNKS)
+            done = threading.Event()
+            producer = threading.Thread(
+                target=self._prefetch,
+                args=(audio_stream, chunks, stop_event, done),
+                name="mouth-prefetch",
+                daemon=True
             )
+            producer.start()
             
-            # 3. Play chunks with interruption check
+            # 4. Play chunks with interruption check, writing in bulk
+            buf = bytearray()
             try:
-                for chunk in audio_stream:
-                    # Check for interruption before playing each chunk
+                while True:
+                    # Check for interruption before buffering each chunk
                     if stop_event.is_set():
                         print("🛑 Mouth: Interrupted mid-speech!")
+                        buf.clear()
+                        break
+                    try:
+                        chunk = chunks.get(timeout=POLL_INTERVAL)
+                    except queue.Empty:
+                        continue
+                    if chunk is None:
                         break
-                    stream.write(chunk)
+                    if isinstance(chunk, Exception):
+                        raise chunk
+                    buf.extend(chunk)
+                    if len(buf) >= WRITE_CHUNK_BYTES:
+                        stream.write(bytes(buf))
+                        buf.clear()
+                
+                if buf:
+                    stream.write(bytes(buf))
             finally:
+                done.set()
+                # Stop (drain) but keep the stream open for the next utterance
                 stream.stop_stream()
-                stream.close()
-                self._audio.terminate()
-                self._audio = None
             
         except Exception as e:
             print(f"❌ Mouth Error: {e}")
+            # Don't keep a possibly broken device stream; reopen on next speak()
+            if self._stream is not None:
+                try:
+                    self._stream.close()
+                except Exception:
+                    pass
+                self._stream = None
         finally:
             self._is_speaking = False
 
+    @staticmethod
+    def _prefetch(audio_stream, chunks: queue.Queue, stop_event: threading.Event, done: threading.Event):
+        """
+        Producer: copy ElevenLabs chunks into the bounded queue.
+        
+        Ends with None, or the exception that broke the stream; gives up
+        as soon as playback is interrupted or finished.
+        """
+        def put(item) -> bool:
+            while not (stop_event.is_set() or done.is_set()):
+                try:
+                    chunks.put(item, timeout=POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        try:
+            for chunk in audio_stream:
+                if not put(chunk):
+                    return
+        except Exception as e:
+            put(e)
+        else:
+            put(None)
+
     def stop(self):
         """
         Immediately stops audio playback.
@@ -84,6 +161,38 @@ class Mouth:
         print("🛑 Mouth: Stop signal received.")
         self._interrupt_event.set()
     
+    def _get_stream(self):
+        """Lazily open PyAudio and the 16-bit mono output stream."""
+        if self._stream is None:
+            if self._audio is None:
+                self._audio = pyaudio.PyAudio()
+            self._stream = self._audio.open(
+                format=pyaudio.paInt16,
+                channels=1,
+                rate=SAMPLE_RATE,
+                output=True,
+                frames_per_buffer=FRAMES_PER_BUFFER
+            )
+        return self._stream
+    
+    def close(self):
+        """
+        Closes the output stream and releases the PyAudio instance.
+        """
+        with self._playback_lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+            if self._audio is not None:
+                self._audio.terminate()
+                self._audio = None
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+    
     @property
     def is_speaking(self) -> bool:
         """Check if currently speaking."""
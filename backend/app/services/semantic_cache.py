@@ -0,0 +1,159 @@
+"""
+semantic_cache.py - LLM Response Cache for Zed
+
+Skips the Groq round-trip when a near-identical question was answered
+recently with the same retrieved course material.
+
+- Entries are keyed by the question's embedding (cosine similarity)
+  plus a hash of the RAG context that went into the system prompt
+- Embeddings live in one preallocated int8 matrix (per-row scale):
+  a lookup is one integer matrix-vector product
+- LRU eviction + TTL expiry
+
+Usage:
+    from app.services.semantic_cache import SemanticCache
+
+    cache = SemanticCache()
+    tokens = cache.lookup(query_emb, context)
+    if tokens is None:
+        tokens = [...]  # call the LLM
+        cache.add(query_emb, context, tokens)
+"""
+
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+DEFAULT_CAPACITY = 256
+DEFAULT_THRESHOLD = 0.95
+DEFAULT_TTL_SECONDS = 300.0
+
+
+# ============================================================
+# SEMANTIC RESPONSE CACHE
+# ============================================================
+
+class SemanticCache:
+    """
+    Thread-safe LRU + TTL cache of streamed LLM responses.
+
+    Rows of a (capacity, dim) int8 matrix hold L2-normalized question
+    embeddings, symmetrically quantized with one float32 scale per row (a
+    quarter of the float32 footprint; cosine error is ~1e-3, far below the
+    hit threshold margin). Parallel arrays hold each slot's context hash
+    and expiry time, so matching, context filtering and expiry are all
+    vectorized.
+    """
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        threshold: float = DEFAULT_THRESHOLD,
+        ttl: float = DEFAULT_TTL_SECONDS
+    ):
+        """
+        Args:
+            capacity: Maximum number of cached responses
+            threshold: Minimum cosine similarity for a hit
+            ttl: Seconds an entry stays valid
+        """
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._vecs: Optional[np.ndarray] = None  # int8, allocated on first add (dim unknown)
+        self._scales = np.zeros(capacity, dtype=np.float32)
+        self._context = np.zeros(capacity, dtype=np.uint64)
+        self._expires = np.zeros(capacity, dtype=np.float64)  # 0 = empty slot
+        # slot -> response tokens, least recently used first
+        self._tokens: OrderedDict[int, list[str]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _quantize(vec: np.ndarray) -> tuple[np.ndarray, float]:
+        """Symmetric int8 quantization: vec ~= q * scale."""
+        scale = float(np.abs(vec).max()) / 127.0 or 1.0
+        return np.round(vec / scale).astype(np.int8), scale
+
+    @staticmethod
+    def context_key(context: str) -> int:
+        """64-bit hash of the retrieved context block."""
+        return int.from_bytes(hashlib.blake2b(context.encode(), digest_size=8).digest(), "little")
+
+    def lookup(self, query_emb: np.ndarray, context: str) -> Optional[list[str]]:
+        """
+        Tokens of the most similar live entry built from the same context.
+
+        Args:
+            query_emb: L2-normalized embedding of the user's question
+            context: Retrieved course material used in the system prompt
+
+        Returns:
+            Cached response tokens, or None on a miss
+        """
+        key = self.context_key(context)
+        with self._lock:
+            if not self._tokens:
+                self.misses += 1
+                return None
+
+            live = (self._expires > time.monotonic()) & (self._context == key)
+            if not live.any():
+                self.misses += 1
+                return None
+
+            # Rows are L2-normalized, so the (dequantized) dot product is
+            # cosine similarity; accumulate int8 products in int32
+            q, q_scale = self._quantize(query_emb)
+            dots = np.einsum("ij,j->i", self._vecs, q, dtype=np.int32)
+            sims = dots.astype(np.float32) * (self._scales * q_scale)
+            sims[~live] = -np.inf
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self._tokens.move_to_end(best)
+            self.hits += 1
+            return self._tokens[best]
+
+    def add(self, query_emb: np.ndarray, context: str, tokens: list[str]) -> None:
+        """Insert a response, evicting an expired or the least recently used entry."""
+        key = self.context_key(context)
+        now = time.monotonic()
+        with self._lock:
+            if self._vecs is None:
+                self._vecs = np.zeros((self.capacity, len(query_emb)), dtype=np.int8)
+
+            free = np.flatnonzero(self._expires <= now)
+            if free.size:
+                slot = int(free[0])
+                self._tokens.pop(slot, None)
+            else:
+                slot, _ = self._tokens.popitem(last=False)
+
+            self._vecs[slot], self._scales[slot] = self._quantize(query_emb)
+            self._context[slot] = key
+            self._expires[slot] = now + self.ttl
+            self._tokens[slot] = tokens
+
+    def clear(self) -> None:
+        """Drop all entries (the matrix is kept for reuse)."""
+        with self._lock:
+            self._expires[:] = 0
+            self._tokens.clear()
+
+    def __len__(self) -> int:
+        """Number of live (unexpired) entries."""
+        with self._lock:
+            return int(np.count_nonzero(self._expires > time.monotonic()))
@@ -21,22 +21,31 @@ Usage:
 """
 
 import os
-import io
-import json
+import re
 import wave
 import asyncio
 import logging
-import tempfile
+import threading
+import itertools
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Optional
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
-from groq import Groq
-from elevenlabs.client import ElevenLabs
+from groq import AsyncGroq, Groq
+from elevenlabs.client import AsyncElevenLabs
+import httpx
+import orjson
+
+# Optional: single-pass wake phrase matching (pip install pyahocorasick)
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 # ============================================================
 # CONFIGURATION
@@ -56,23 +65,58 @@ logger = logging.getLogger("zed.server")
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("httpcore").setLevel(logging.WARNING)
 
-# Groq client for transcription
+# Groq clients: async for Whisper transcription (awaited on the event loop),
+# sync for the SKIP_RAG fast path (runs on a worker thread)
+groq_async_client = AsyncGroq(api_key=os.environ.get("GROQ_API_KEY"))
 groq_client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
 
-# ElevenLabs client for TTS
+# ElevenLabs client for TTS - async, one keep-alive pool shared by all sessions
 eleven_api_key = os.environ.get("ELEVEN_API_KEY")
-eleven_client = ElevenLabs(api_key=eleven_api_key) if eleven_api_key else None
 ELEVEN_VOICE_ID = os.environ.get("ELEVEN_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")  # Rachel
 ELEVEN_MODEL_ID = "eleven_turbo_v2_5"  # Fastest model
+TTS_MAX_CONCURRENCY = int(os.environ.get("TTS_MAX_CONCURRENCY", "8"))  # In-flight ElevenLabs requests
+eleven_client = AsyncElevenLabs(
+    api_key=eleven_api_key,
+    httpx_client=httpx.AsyncClient(
+        timeout=30.0,
+        limits=httpx.Limits(
+            max_connections=TTS_MAX_CONCURRENCY,
+            max_keepalive_connections=TTS_MAX_CONCURRENCY
+        )
+    )
+) if eleven_api_key else None
 
 # Server config
 HOST = os.environ.get("SERVER_HOST", "0.0.0.0")
 PORT = int(os.environ.get("SERVER_PORT", "8000"))
+RELOAD = os.environ.get("SERVER_RELOAD", "true").lower() == "true"  # Disable in production
 SKIP_RAG = os.environ.get("SKIP_RAG", "false").lower() == "true"  # For fast testing
+DEBUG_ENDPOINTS = os.environ.get("DEBUG_ENDPOINTS", "false").lower() == "true"  # Expose /debug/* routes
+
+# Audio blobs smaller than this are VAD misfires, not speech
+MIN_AUDIO_BYTES = 1000
+
+# Per-connection pipeline: max items waiting between stages (backpressure)
+STAGE_QUEUE_SIZE = 2
+
+# Streamed tokens are coalesced into one websocket frame per batch: flushed
+# once this much time has passed since the last frame or enough text queued
+TOKEN_BATCH_SECONDS = 0.02
+TOKEN_BATCH_CHARS = 48
+
+# Sentence-level TTS: shorter fragments are merged into the next sentence
+TTS_MIN_SENTENCE_CHARS = 10
+# ...and run-on text is cut at the next word boundary past this length
+TTS_MAX_SENTENCE_CHARS = 200
 
 # Wake Word Configuration
 WAKE_PHRASE = "hey zed"
 WAKE_GREETING = "I am ready."
+WAKE_VARIATIONS = [
+    "hey zed", "hey, zed", "hey zedd", "hey zad",
+    "hey zet", "hey said", "hey set", "heyzed",
+    "hey z", "hey z.", "a zed", "hey fed"  # Common misrecognitions
+]
 
 # ============================================================
 # BRAIN SINGLETON
@@ -100,6 +144,28 @@ def get_cached_brain():
     return _brain
 
 
+def prewarm_services() -> None:
+    """
+    Load the Brain, then open the Groq HTTP connections.
+    
+    A cheap authenticated GET on each client puts a live keep-alive
+    connection in its pool, so the first user turn skips the TCP + TLS
+    handshakes. (ElevenLabs is async and warmed on the event loop.)
+    """
+    brain = get_cached_brain()
+    
+    warmups = [("Groq", groq_client.models.list)]
+    if brain is not None:
+        warmups.append(("Groq (Brain)", brain.client.models.list))
+    
+    for name, warm in warmups:
+        try:
+            warm()
+            logger.info(f"🔥 {name} connection warmed")
+        except Exception as e:
+            logger.warning(f"{name} warm-up failed: {e}")
+
+
 # ============================================================
 # FASTAPI APP
 # ============================================================
@@ -120,55 +186,75 @@ app.add_middleware(
 )
 
 
+# Strong references to fire-and-forget startup tasks (the event loop only
+# keeps weak ones, so an unreferenced task can be collected mid-run)
+_background_tasks: set[asyncio.Task] = set()
+
+
+def run_in_background(coro) -> asyncio.Task:
+    """Schedule a coroutine, keeping it alive and logging any failure."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_task_done)
+    return task
+
+
+def _background_task_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Background task {task.get_coro().__qualname__} failed: {task.exception()}")
+
+
 @app.on_event("startup")
 async def startup_event():
-    """Pre-load Brain and Knowledge Base on server startup."""
+    """Pre-load Brain and Knowledge Base and warm API connections on server startup."""
     logger.info("🚀 Starting Zed server...")
     # Pre-load in background to not block startup
-    import threading
-    threading.Thread(target=get_cached_brain, daemon=True).start()
+    threading.Thread(target=prewarm_services, daemon=True).start()
+    run_in_background(warm_transcription_client())
+    if tts_dispatcher:
+        run_in_background(tts_dispatcher.warm())
+        # Synthesize the wake greeting now so waking up is a memory read
+        run_in_background(precompute_greeting())
 
 
 # ============================================================
 # AUDIO TRANSCRIPTION
 # ============================================================
 
-async def transcribe_audio(audio_bytes: bytes, format_hint: str = "webm") -> Optional[str]:
+async def transcribe_audio(audio_bytes: bytes) -> Optional[str]:
     """
     Transcribe audio bytes using Groq Whisper.
     
+    The container is detected from the magic bytes (WAV starts with
+    "RIFF"; anything else is sent as the browser's WebM).
+    
     Args:
         audio_bytes: Raw audio data (WAV or WebM)
-        format_hint: Audio format hint ("wav" or "webm")
     
     Returns:
         Transcribed text or None on error
     """
-    if not audio_bytes or len(audio_bytes) < 1000:
+    if not audio_bytes or len(audio_bytes) < MIN_AUDIO_BYTES:
         logger.warning("Audio too short, skipping transcription")
         return None
     
     try:
-        # Create a temporary file with the appropriate extension
-        suffix = f".{format_hint}"
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-            tmp.write(audio_bytes)
-            tmp_path = tmp.name
+        # Upload straight from memory as a (filename, content, mime) tuple -
+        # no file object or copy; the extension tells Whisper the format
+        audio_format = "wav" if audio_bytes.startswith(b'RIFF') else "webm"
+        audio_file = (f"audio.{audio_format}", audio_bytes, f"audio/{audio_format}")
         
-        logger.info(f"Transcribing {len(audio_bytes)} bytes of {format_hint} audio...")
+        logger.info(f"Transcribing {len(audio_bytes)} bytes of {audio_format} audio...")
         
-        # Open and transcribe
-        with open(tmp_path, "rb") as audio_file:
-            transcription = groq_client.audio.transcriptions.create(
-                file=audio_file,
-                model="whisper-large-v3-turbo",
-                response_format="json",
-                language="en",
-                temperature=0.0
-            )
-        
-        # Cleanup temp file
-        os.unlink(tmp_path)
+        # Async SDK: other connections keep being served during the round-trip
+        transcription = await groq_async_client.audio.transcriptions.create(
+            file=audio_file,
+            model="whisper-large-v3-turbo",
+            response_format="json",
+            language="en",
+            temperature=0.0
+        )
         
         text = transcription.text.strip()
         logger.info(f"Transcribed: '{text[:50]}...' ({len(text)} chars)")
@@ -179,10 +265,36 @@ async def transcribe_audio(audio_bytes: bytes, format_hint: str = "webm") -> Opt
         return None
 
 
+async def warm_transcription_client() -> None:
+    """Open a pooled connection on the async Groq client used for Whisper."""
+    try:
+        await groq_async_client.models.list()
+        logger.info("🔥 Groq (Whisper) connection warmed")
+    except Exception as e:
+        logger.warning(f"Groq (Whisper) warm-up failed: {e}")
+
+
 # ============================================================
 # WAKE WORD DETECTION
 # ============================================================
 
+def _build_wake_automaton():
+    """Aho-Corasick automaton over WAKE_VARIATIONS (None if unavailable)."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for variation in WAKE_VARIATIONS:
+        automaton.add_word(variation, variation)
+    automaton.make_automaton()
+    return automaton
+
+
+_WAKE_AUTOMATON = _build_wake_automaton()
+# Fallback without pyahocorasick: one precompiled, case-insensitive
+# alternation (C-level scan, no per-call lowercase copy)
+_WAKE_RE = re.compile("|".join(re.escape(v) for v in WAKE_VARIATIONS), re.IGNORECASE)
+
+
 def contains_wake_phrase(text: str) -> bool:
     """
     Check if text contains the wake phrase "Hey ZED".
@@ -195,17 +307,10 @@ def contains_wake_phrase(text: str) -> bool:
     """
     if not text:
         return False
-    text_lower = text.lower().strip()
-    # Check for various spellings/variations
-    wake_variations = [
-        "hey zed", "hey, zed", "hey zedd", "hey zad",
-        "hey zet", "hey said", "hey set", "heyzed",
-        "hey z", "hey z.", "a zed", "hey fed"  # Common misrecognitions
-    ]
-    for variation in wake_variations:
-        if variation in text_lower:
-            return True
-    return False
+    # One pass over the text for all spellings/variations
+    if _WAKE_AUTOMATON is not None:
+        return next(_WAKE_AUTOMATON.iter(text.lower()), None) is not None
+    return _WAKE_RE.search(text) is not None
 
 
 # ============================================================
@@ -261,6 +366,68 @@ def get_brain_response(text: str, conversation_id: str = "default"):
         yield f"[Error: {str(e)}]"
 
 
+async def stream_brain_tokens(text: str, conversation_id: str = "default") -> AsyncIterator[list[str]]:
+    """
+    Stream Brain tokens without blocking the event loop, in batches.
+    
+    The blocking generator runs in a worker thread that hands tokens to
+    an asyncio.Queue; each batch is whatever arrived within
+    TOKEN_BATCH_SECONDS of the previous one (or TOKEN_BATCH_CHARS of
+    text), so a fast stream becomes a few frames instead of one per token.
+    
+    Args:
+        text: User's transcribed text
+        conversation_id: Session ID for conversation memory
+    
+    Yields:
+        Lists of consecutive tokens (never empty)
+    """
+    loop = asyncio.get_running_loop()
+    tokens: asyncio.Queue[Optional[str]] = asyncio.Queue()
+    stop = threading.Event()
+    
+    def produce():
+        try:
+            for token in get_brain_response(text, conversation_id):
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(tokens.put_nowait, token)
+        finally:
+            loop.call_soon_threadsafe(tokens.put_nowait, None)
+    
+    loop.run_in_executor(None, produce)
+    try:
+        last_flush = loop.time()
+        finished = False
+        while not finished:
+            batch = [await tokens.get()]
+            if batch[0] is None:
+                break
+            size = len(batch[0])
+            while size < TOKEN_BATCH_CHARS:
+                # Drain what is already queued, then wait out the window
+                try:
+                    token = tokens.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = last_flush + TOKEN_BATCH_SECONDS - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        token = await asyncio.wait_for(tokens.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if token is None:
+                    finished = True
+                    break
+                batch.append(token)
+                size += len(token)
+            yield batch
+            last_flush = loop.time()
+    finally:
+        # Consumer stopped early (hangup, disconnect): let the thread exit
+        stop.set()
+
+
 # ============================================================
 # TEXT-TO-SPEECH
 # ============================================================
@@ -275,7 +442,7 @@ async def generate_tts_audio(text: str) -> bytes:
     Returns:
         Audio bytes (MP3 format)
     """
-    if not eleven_client:
+    if not tts_dispatcher:
         logger.warning("ElevenLabs not configured, skipping TTS")
         return b""
     
@@ -289,16 +456,7 @@ async def generate_tts_audio(text: str) -> bytes:
     try:
         logger.info(f"🔊 Generating TTS for: '{text[:50]}...'")
         
-        # Generate audio (returns generator of bytes)
-        audio_generator = eleven_client.text_to_speech.convert(
-            text=text,
-            voice_id=ELEVEN_VOICE_ID,
-            model_id=ELEVEN_MODEL_ID,
-            output_format="mp3_44100_128",  # Good quality MP3
-        )
-        
-        # Collect all chunks
-        audio_bytes = b"".join(audio_generator)
+        audio_bytes = await tts_dispatcher.submit(text)
         logger.info(f"✅ TTS generated: {len(audio_bytes)} bytes")
         
         return audio_bytes
@@ -308,17 +466,204 @@ async def generate_tts_audio(text: str) -> bytes:
         return b""
 
 
+class TTSDispatcher:
+    """
+    Single entry point for ElevenLabs synthesis across all sessions.
+    
+    Requests share one async keep-alive connection pool, and a semaphore
+    caps how many are in flight so bursts from many sessions queue here
+    instead of tripping the account's concurrency limit (HTTP 429).
+    """
+    
+    def __init__(self, client: AsyncElevenLabs, max_concurrent: int = TTS_MAX_CONCURRENCY):
+        """
+        Args:
+            client: Shared async ElevenLabs client
+            max_concurrent: Maximum simultaneous TTS requests
+        """
+        self.client = client
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+    
+    async def submit(self, text: str) -> bytes:
+        """
+        Synthesize text over the streaming endpoint.
+        
+        Returns:
+            Complete MP3 bytes (the frontend decodes each blob on its own,
+            so partial chunks are not forwarded)
+        """
+        async with self._semaphore:
+            chunks = []
+            async for chunk in self.client.text_to_speech.stream(
+                ELEVEN_VOICE_ID,
+                text=text,
+                model_id=ELEVEN_MODEL_ID,
+                output_format="mp3_44100_128",  # Good quality MP3
+            ):
+                chunks.append(chunk)
+            return b"".join(chunks)
+    
+    async def warm(self) -> None:
+        """Open a pooled connection with a cheap authenticated GET."""
+        try:
+            await self.client.voices.get(ELEVEN_VOICE_ID)
+            logger.info("🔥 ElevenLabs connection warmed")
+        except Exception as e:
+            logger.warning(f"ElevenLabs warm-up failed: {e}")
+
+
+tts_dispatcher = TTSDispatcher(eleven_client) if eleven_client else None
+
+# Audio for fixed phrases (the wake greeting), synthesized once
+_fixed_audio: dict[str, bytes] = {}
+
+
+async def get_fixed_audio(text: str) -> bytes:
+    """
+    TTS for a phrase that never changes, cached after the first success.
+    
+    Args:
+        text: Fixed phrase to speak
+    
+    Returns:
+        Audio bytes (MP3 format), empty if TTS is unavailable
+    """
+    audio = _fixed_audio.get(text)
+    if audio is None:
+        audio = await generate_tts_audio(text)
+        if audio:
+            _fixed_audio[text] = audio
+    return audio
+
+
+async def precompute_greeting() -> None:
+    """Cache the wake greeting's audio at startup."""
+    if await get_fixed_audio(WAKE_GREETING):
+        logger.info("🔥 Wake greeting audio cached")
+    else:
+        logger.warning("Wake greeting TTS failed at startup - first wake will synthesize it")
+
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets) at the
+# end of the buffer, confirmed by whitespace starting the next token
+_SENTENCE_END_RE = re.compile(r'[.!?]["\')\]]*$')
+
+
+class SentenceSpeaker:
+    """
+    Pipelines TTS with LLM streaming, one ElevenLabs request per sentence.
+    
+    Each completed sentence starts synthesizing immediately; a writer task
+    sends the audio blobs to the client in sentence order. First audio
+    arrives after the first sentence instead of after the whole response.
+    """
+    
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.has_audio = False
+        self._buffer = ""
+        self._pending: asyncio.Queue[Optional[asyncio.Task]] = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_audio())
+    
+    def feed(self, token: str) -> None:
+        """Add an LLM token, starting TTS when it completes a sentence."""
+        if token[:1].isspace() and (
+            _SENTENCE_END_RE.search(self._buffer)
+            or len(self._buffer) >= TTS_MAX_SENTENCE_CHARS
+        ):
+            self._flush()
+        self._buffer += token
+        if "\n" in token:
+            self._flush()
+    
+    async def finish(self) -> bool:
+        """
+        Speak the remaining text and wait until all audio has been sent.
+        
+        Returns:
+            True if any audio was sent
+        """
+        self._flush(force=True)
+        self._pending.put_nowait(None)
+        await self._writer
+        return self.has_audio
+    
+    def cancel(self) -> None:
+        """Abandon pending synthesis (no-op after finish())."""
+        self._writer.cancel()
+        while not self._pending.empty():
+            task = self._pending.get_nowait()
+            if task is not None:
+                task.cancel()
+    
+    def _flush(self, force: bool = False) -> None:
+        text = self._buffer.strip()
+        if not text or (len(text) < TTS_MIN_SENTENCE_CHARS and not force):
+            return
+        self._buffer = ""
+        self._pending.put_nowait(asyncio.create_task(generate_tts_audio(text)))
+    
+    async def _write_audio(self) -> None:
+        while (task := await self._pending.get()) is not None:
+            audio = await task
+            if audio:
+                await self.websocket.send_bytes(audio)
+                self.has_audio = True
+
+
 # ============================================================
 # WEBSOCKET HANDLER WITH WAKE WORD SESSION MANAGEMENT
 # ============================================================
 
+@dataclass(slots=True)
+class ConnState:
+    """Per-connection state (slotted: no per-instance dict)."""
+    websocket: WebSocket
+    is_awake: bool
+    connected_at: datetime
+
+
 # Store active connections and their state
-active_connections: dict[str, dict] = {}
+active_connections: dict[str, ConnState] = {}
+# Session IDs: unique per process, even for connections accepted together
+_session_ids = itertools.count(1)
+# Number of AWAKE connections, kept in step with every is_awake change so
+# the health check doesn't scan all connections
+awake_connections = 0
+
+
+def set_awake(conn: ConnState, awake: bool) -> None:
+    """Set a connection's is_awake flag, updating the awake counter."""
+    global awake_connections
+    if conn.is_awake != awake:
+        conn.is_awake = awake
+        awake_connections += 1 if awake else -1
+
 
 # HANGUP token from Brain
 HANGUP_TOKEN = "[HANGUP]"
 
 
+async def send_json(websocket: WebSocket, payload: dict) -> None:
+    """
+    Send a JSON frame, encoded with orjson (C) instead of stdlib json.
+    
+    Still a text frame: the frontend treats every binary frame as audio.
+    """
+    await websocket.send_text(orjson.dumps(payload).decode())
+
+
+# Constant envelope of streamed response frames - only the text is encoded
+_RESPONSE_FRAME_PREFIX = b'{"type":"response","text":'
+_RESPONSE_FRAME_SUFFIX = b',"done":false}'
+
+
+async def send_response_text(websocket: WebSocket, text: str) -> None:
+    """Send a streamed {"type": "response", "done": false} frame for text."""
+    frame = _RESPONSE_FRAME_PREFIX + orjson.dumps(text) + _RESPONSE_FRAME_SUFFIX
+    await websocket.send_text(frame.decode())
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """
@@ -333,152 +678,183 @@ async def websocket_endpoint(websocket: WebSocket):
     - Server checks wake word state before processing
     - Server sends JSON {type: "status", mode: "asleep"|"awake", text: "..."}
     - Server sends JSON {type: "response", text: "...", done: bool}
+    - Server sends binary MP3 blobs (one per sentence, in order) before the
+      final {done: true} frame
     """
     await websocket.accept()
     
     # Generate session ID
-    session_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    session_id = f"s{next(_session_ids)}"
     
     # ═══════════════════════════════════════════════════════════
     # TASK 1: Initialize State - Start ASLEEP
     # ═══════════════════════════════════════════════════════════
-    is_awake = False
-    
-    active_connections[session_id] = {
-        "websocket": websocket,
-        "is_awake": is_awake,
-        "connected_at": datetime.now()
-    }
+    conn = ConnState(websocket=websocket, is_awake=False, connected_at=datetime.now())
+    active_connections[session_id] = conn
     
     logger.info(f"🔌 Client connected: {session_id} | State: ASLEEP")
     
     # Send initial status
-    await websocket.send_json({
+    await send_json(websocket, {
         "type": "status",
         "mode": "asleep",
         "text": "🔴 Waiting for 'Hey ZED'..."
     })
     
-    try:
+    # Staged pipeline: receive → transcribe → respond (Brain + TTS).
+    # Bounded queues give backpressure; the next utterance is transcribed
+    # while the current response is still streaming and being spoken.
+    inbox: asyncio.Queue[tuple[str, object]] = asyncio.Queue(maxsize=STAGE_QUEUE_SIZE)
+    utterances: asyncio.Queue[str] = asyncio.Queue(maxsize=STAGE_QUEUE_SIZE)
+    
+    async def enqueue(item: tuple[str, object]):
+        """Queue work without blocking the reader; reject it when the pipeline is full."""
+        try:
+            inbox.put_nowait(item)
+        except asyncio.QueueFull:
+            logger.warning(f"Pipeline busy, dropping {item[0]} input")
+            await send_json(websocket, {
+                "type": "error",
+                "message": "Busy - still processing previous requests"
+            })
+    
+    async def receive_stage():
+        """Read frames: answer control messages inline, queue audio and text."""
         while True:
-            # Receive message (can be binary or text)
+            # Receive message (can be binary or text). One reader for both:
+            # they share a channel, so typed iter_bytes()/iter_text() would
+            # each fail on the other's frames
             message = await websocket.receive()
-            text = None  # Will hold transcribed or direct text
+            
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            
+            audio_bytes = message.get("bytes")
+            text_frame = message.get("text")
             
             # ─────────────────────────────────────────────────
             # BINARY: Audio blob from browser
             # ─────────────────────────────────────────────────
-            if "bytes" in message:
-                audio_bytes = message["bytes"]
-                logger.info(f"📥 Received audio: {len(audio_bytes)} bytes | Awake: {is_awake}")
-                
-                # Detect format from magic bytes
-                format_hint = "webm"
-                if audio_bytes[:4] == b'RIFF':
-                    format_hint = "wav"
-                elif audio_bytes[:4] == b'\x1aE\xdf\xa3':
-                    format_hint = "webm"
-                
-                # Transcribe
-                text = await transcribe_audio(audio_bytes, format_hint)
-                
-                if not text:
-                    await websocket.send_json({
+            if audio_bytes is not None:
+                # Reject tiny blobs here, without queueing a transcription
+                if len(audio_bytes) < MIN_AUDIO_BYTES:
+                    logger.warning("Audio too short, skipping transcription")
+                    await send_json(websocket, {
                         "type": "error",
                         "message": "Could not transcribe audio"
                     })
                     continue
-                
-                # Send transcription back for UI feedback
-                await websocket.send_json({
-                    "type": "transcription",
-                    "text": text
-                })
+                logger.info(f"📥 Received audio: {len(audio_bytes)} bytes | Awake: {conn.is_awake}")
+                await enqueue(("audio", audio_bytes))
             
             # ─────────────────────────────────────────────────
             # TEXT: JSON command from browser
             # ─────────────────────────────────────────────────
-            elif "text" in message:
+            elif text_frame is not None:
                 try:
-                    data = json.loads(message["text"])
-                    msg_type = data.get("type", "text")
-                    
-                    if msg_type == "ping":
-                        await websocket.send_json({"type": "pong"})
-                        continue
-                    
-                    if msg_type == "config":
-                        logger.info(f"⚙️ Client config: {data}")
-                        await websocket.send_json({
-                            "type": "config_ack",
-                            "status": "ok",
-                            "is_awake": is_awake
-                        })
-                        continue
-                    
-                    if msg_type == "text":
-                        text = data.get("text", "").strip()
-                        if text:
-                            # Send back as transcription for UI consistency
-                            await websocket.send_json({
-                                "type": "transcription",
-                                "text": text
-                            })
-                
-                except json.JSONDecodeError:
+                    data = orjson.loads(text_frame)
+                except orjson.JSONDecodeError:
                     logger.warning("Invalid JSON received")
-                    await websocket.send_json({
+                    await send_json(websocket, {
                         "type": "error",
                         "message": "Invalid JSON"
                     })
                     continue
+                
+                msg_type = data.get("type", "text")
+                
+                if msg_type == "ping":
+                    await send_json(websocket, {"type": "pong"})
+                
+                elif msg_type == "config":
+                    logger.info(f"⚙️ Client config: {data}")
+                    await send_json(websocket, {
+                        "type": "config_ack",
+                        "status": "ok",
+                        "is_awake": conn.is_awake
+                    })
+                
+                elif msg_type == "text":
+                    text = data.get("text", "").strip()
+                    if text:
+                        await enqueue(("text", text))
+    
+    async def transcribe_stage():
+        """Turn queued audio (or typed text) into utterances for the Brain."""
+        while True:
+            kind, payload = await inbox.get()
+            
+            if kind == "audio":
+                # Transcribe
+                text = await transcribe_audio(payload)
+                
+                if not text:
+                    await send_json(websocket, {
+                        "type": "error",
+                        "message": "Could not transcribe audio"
+                    })
+                    continue
+            else:
+                text = payload
+            
+            # Send transcription back for UI feedback (typed text is echoed
+            # the same way for UI consistency)
+            await send_json(websocket, {
+                "type": "transcription",
+                "text": text
+            })
+            await utterances.put(text)
+    
+    async def respond_stage():
+        """Gatekeeper + Brain + sentence-level TTS for each utterance."""
+        while True:
+            text = await utterances.get()
             
             # ═══════════════════════════════════════════════════════════
             # TASK 2: GATEKEEPER LOGIC - ASLEEP vs AWAKE
             # ═══════════════════════════════════════════════════════════
             
-            if not text:
-                continue  # No text to process
-            
             # ─────────────────────────────────────────────────
             # A. IF ASLEEP: Check for wake word
             # ─────────────────────────────────────────────────
-            if not is_awake:
+            if not conn.is_awake:
                 if not contains_wake_phrase(text):
                     # Ignore - still asleep
                     logger.info(f"💤 Ignored (Asleep): '{text[:50]}...'")
-                    await websocket.send_json({
+                    await send_json(websocket, {
                         "type": "status",
                         "mode": "asleep",
                         "text": f"💤 Ignored (Asleep): {text[:30]}..."
                     })
-                    continue  # ← Do NOT call Brain, go to next iteration
+                    continue  # ← Do NOT call Brain, go to next utterance
                 
                 # ═══════════════════════════════════════════════
                 # WAKE WORD DETECTED! Transition to AWAKE
                 # ═══════════════════════════════════════════════
-                is_awake = True
-                active_connections[session_id]["is_awake"] = True
+                set_awake(conn, True)
                 
                 logger.info(f"🌅 Wake Word Detected! Session {session_id} is now AWAKE")
                 
                 # Notify frontend of state change
-                await websocket.send_json({
+                await send_json(websocket, {
                     "type": "status",
                     "mode": "awake",
                     "text": "🟢 Listening..."
                 })
                 
                 # Send audio cue command (frontend can play a beep)
-                await websocket.send_json({
+                await send_json(websocket, {
                     "type": "audio_cue",
                     "name": "wake_beep"
                 })
                 
-                # Generate and send greeting TTS
-                greeting_audio = await generate_tts_audio(WAKE_GREETING)
+                # Generate and send greeting TTS (audio precedes the done frame)
+                greeting_audio = await get_fixed_audio(WAKE_GREETING)
+                
+                if greeting_audio:
+                    await websocket.send_bytes(greeting_audio)
                 
-                await websocket.send_json({
+                await send_json(websocket, {
                     "type": "response",
                     "text": WAKE_GREETING,
                     "done": True,
@@ -486,9 +862,6 @@ async def websocket_endpoint(websocket: WebSocket):
                     "has_audio": len(greeting_audio) > 0
                 })
                 
-                if greeting_audio:
-                    await websocket.send_bytes(greeting_audio)
-                
                 # Done processing wake word - wait for next input
                 continue
             
@@ -497,91 +870,80 @@ async def websocket_endpoint(websocket: WebSocket):
             # ─────────────────────────────────────────────────
             logger.info(f"🧠 Processing (Awake): '{text[:50]}...'")
             
-            # Get Brain response (streaming)
-            full_response = ""
+            # Get Brain response (streaming), speaking each sentence as it completes
+            response_parts: list[str] = []
             hangup_detected = False
+            speaker = SentenceSpeaker(websocket)
             
-            for token in get_brain_response(text, session_id):
-                # ═══════════════════════════════════════════════
-                # Monitor for [HANGUP] token
-                # ═══════════════════════════════════════════════
-                if HANGUP_TOKEN in token:
-                    hangup_detected = True
-                    # Extract any text before the hangup token
-                    clean_token = token.replace(HANGUP_TOKEN, "")
-                    if clean_token:
-                        full_response += clean_token
-                        await websocket.send_json({
-                            "type": "response",
-                            "text": clean_token,
-                            "done": False
-                        })
-                    break  # Stop streaming
+            batches = stream_brain_tokens(text, session_id)
+            
+            try:
+                async for batch in batches:
+                    chunk = "".join(batch)
+                    # ═══════════════════════════════════════════════
+                    # Monitor for [HANGUP] token
+                    # ═══════════════════════════════════════════════
+                    if HANGUP_TOKEN in chunk:
+                        hangup_detected = True
+                        # Keep only the text before the hangup token
+                        batch = [chunk.split(HANGUP_TOKEN, 1)[0]]
+                        chunk = batch[0]
+                    
+                    if chunk:
+                        response_parts.append(chunk)
+                        for token in batch:
+                            speaker.feed(token)
+                        await send_response_text(websocket, chunk)
+                    
+                    if hangup_detected:
+                        break  # Stop streaming
                 
-                full_response += token
-                await websocket.send_json({
-                    "type": "response",
-                    "text": token,
-                    "done": False
-                })
+                # Speak the last sentence; all audio is sent before "done"
+                has_audio = await speaker.finish()
+            finally:
+                speaker.cancel()
+                await batches.aclose()
+            
+            # Signal completion
+            await send_json(websocket, {
+                "type": "response",
+                "text": "",
+                "done": True,
+                "full_text": "".join(response_parts),
+                "has_audio": has_audio
+            })
             
             # ═══════════════════════════════════════════════
             # Handle session termination (HANGUP detected)
             # ═══════════════════════════════════════════════
             if hangup_detected:
-                is_awake = False
-                active_connections[session_id]["is_awake"] = False
+                set_awake(conn, False)
                 
                 logger.info(f"🌙 Session Ended by User: {session_id} → ASLEEP")
                 
-                # Generate TTS for the farewell message (before hangup)
-                if full_response:
-                    tts_audio = await generate_tts_audio(full_response)
-                else:
-                    tts_audio = b""
-                
-                # Signal completion
-                await websocket.send_json({
-                    "type": "response",
-                    "text": "",
-                    "done": True,
-                    "full_text": full_response,
-                    "has_audio": len(tts_audio) > 0
-                })
-                
-                if tts_audio:
-                    await websocket.send_bytes(tts_audio)
-                
                 # Notify frontend of state change to ASLEEP
-                await websocket.send_json({
+                await send_json(websocket, {
                     "type": "status",
                     "mode": "asleep",
                     "text": "🔴 Asleep - Say 'Hey ZED' to wake me up"
                 })
-                
-                continue  # Keep connection open, but now asleep
-            
-            # Normal response (no hangup) - generate TTS
-            tts_audio = await generate_tts_audio(full_response)
-            
-            # Signal completion with audio
-            await websocket.send_json({
-                "type": "response",
-                "text": "",
-                "done": True,
-                "full_text": full_response,
-                "has_audio": len(tts_audio) > 0
-            })
-            
-            # Send audio as binary if available
-            if tts_audio:
-                await websocket.send_bytes(tts_audio)
     
+    stages = [
+        asyncio.create_task(receive_stage()),
+        asyncio.create_task(transcribe_stage()),
+        asyncio.create_task(respond_stage())
+    ]
+    try:
+        # Runs until a stage fails (e.g. the client disconnects)
+        await asyncio.gather(*stages)
     except WebSocketDisconnect:
         logger.info(f"🔌 Client disconnected: {session_id}")
     except Exception as e:
         logger.error(f"❌ WebSocket error: {e}")
     finally:
+        for stage in stages:
+            stage.cancel()
+        set_awake(conn, False)
         active_connections.pop(session_id, None)
 
 
@@ -592,7 +954,7 @@ async def websocket_endpoint(websocket: WebSocket):
 @app.get("/")
 async def root():
     """Health check endpoint."""
-    awake_count = sum(1 for c in active_connections.values() if c.get("is_awake", False))
+    awake_count = awake_connections
     return {
         "service": "Zed Voice Server",
         "status": "running",
@@ -617,6 +979,25 @@ async def health():
     }
 
 
+# Internal cache stats - only registered when explicitly enabled
+if DEBUG_ENDPOINTS:
+    @app.get("/debug/cache")
+    async def debug_cache():
+        """Retrieval and response cache statistics."""
+        if _brain is None:
+            return {"brain_loaded": _brain_loaded}
+
+        response_cache = _brain.response_cache
+        return {
+            "retrieval": _brain.kb.cache_info(),
+            "response": {
+                "hits": response_cache.hits,
+                "misses": response_cache.misses,
+                "size": len(response_cache)
+            } if response_cache is not None else None
+        }
+
+
 @app.post("/transcribe")
 async def transcribe_endpoint(audio: bytes):
     """
@@ -655,6 +1036,12 @@ if __name__ == "__main__":
         "server:app",
         host=HOST,
         port=PORT,
-        reload=True,
-        log_level="info"
+        reload=RELOAD,
+        log_level="info",
+        # libuv event loop + C HTTP parser: cheaper awaits on the websocket hot path
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+        # Frames are small JSON or already-compressed MP3: deflate only costs CPU
+        ws_per_message_deflate=False
     )
@@ -121,6 +121,11 @@ export function useVoiceInput(config: VoiceInputConfig = {}): [VoiceInputState,
   const volumeIntervalRef = useRef<number | null>(null);
   const currentResponseRef = useRef("");
   
+  // Audio playback queue - the server sends one blob per sentence
+  const audioQueueRef = useRef<Blob[]>([]);
+  const isPlayingAudioRef = useRef(false);
+  const responseDoneRef = useRef(true); // "done" frame received for the current response
+  
   // VAD state refs
   const isSpeakingRef = useRef(false);
   const silenceStartRef = useRef<number | null>(null);
@@ -183,38 +188,58 @@ export function useVoiceInput(config: VoiceInputConfig = {}): [VoiceInputState,
       setIsConnected(false);
     };
     
+    // Play queued sentence blobs back to back; go idle once the queue
+    // drains after the response's "done" frame
+    const playNextAudio = () => {
+      const blob = audioQueueRef.current.shift();
+      if (!blob) {
+        isPlayingAudioRef.current = false;
+        if (responseDoneRef.current) {
+          console.log("🔊 Audio playback finished");
+          // Set cooldown after audio finishes
+          cooldownUntilRef.current = Date.now() + 2000;
+          console.log("⏸️ Cooldown started (2s before listening again)");
+          setStatus("idle");
+        }
+        return;
+      }
+      
+      isPlayingAudioRef.current = true;
+      const audioUrl = URL.createObjectURL(blob);
+      const audio = new Audio(audioUrl);
+      
+      // Set status to speaking while audio plays
+      setStatus("speaking");
+      
+      // onerror and a rejected play() can both fire - advance only once
+      let finished = false;
+      const advance = () => {
+        if (finished) return;
+        finished = true;
+        URL.revokeObjectURL(audioUrl);
+        playNextAudio();
+      };
+      
+      audio.onended = advance;
+      
+      audio.onerror = (e) => {
+        console.error("Audio playback error:", e);
+        advance();
+      };
+      
+      audio.play().catch((e) => {
+        console.error("Failed to play audio:", e);
+        advance();
+      });
+    };
+    
     ws.onmessage = async (event) => {
       // Check if it's binary data (audio)
       if (event.data instanceof Blob) {
         console.log("🔊 Received audio:", event.data.size, "bytes");
-        try {
-          // Play the audio
-          const audioUrl = URL.createObjectURL(event.data);
-          const audio = new Audio(audioUrl);
-          
-          // Set status to speaking while audio plays
-          setStatus("speaking");
-          
-          audio.onended = () => {
-            console.log("🔊 Audio playback finished");
-            URL.revokeObjectURL(audioUrl);
-            
-            // Set cooldown after audio finishes
-            cooldownUntilRef.current = Date.now() + 2000;
-            console.log("⏸️ Cooldown started (2s before listening again)");
-            setStatus("idle");
-          };
-          
-          audio.onerror = (e) => {
-            console.error("Audio playback error:", e);
-            URL.revokeObjectURL(audioUrl);
-            setStatus("idle");
-          };
-          
-          await audio.play();
-        } catch (e) {
-          console.error("Failed to play audio:", e);
-          setStatus("idle");
+        audioQueueRef.current.push(event.data);
+        if (!isPlayingAudioRef.current) {
+          playNextAudio();
         }
         return;
       }
@@ -300,6 +325,7 @@ export function useVoiceInput(config: VoiceInputConfig = {}): [VoiceInputState,
           
           case "response":
             if (data.done) {
+              responseDoneRef.current = true;
               const finalText = data.full_text || currentResponseRef.current;
               if (finalText) {
                 setResponse(finalText);
@@ -313,14 +339,15 @@ export function useVoiceInput(config: VoiceInputConfig = {}): [VoiceInputState,
               }
               currentResponseRef.current = "";
               
-              // If no audio coming, set idle immediately with cooldown
-              if (!data.has_audio) {
+              // Audio is sent before "done": if none is left to play, go idle now
+              if (!isPlayingAudioRef.current) {
                 cooldownUntilRef.current = Date.now() + 2000;
-                console.log("⏸️ Cooldown started (no audio, 2s before listening)");
+                console.log(`⏸️ Cooldown started (${data.has_audio ? "audio done" : "no audio"}, 2s before listening)`);
                 setStatus("idle");
               }
-              // If audio is coming, keep status as "speaking" until audio finishes
+              // Otherwise keep status as "speaking" until the queue drains
             } else {
+              responseDoneRef.current = false;
               currentResponseRef.current += data.text;
               setResponse(currentResponseRef.current);
               setStatus("speaking");